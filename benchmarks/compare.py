@@ -0,0 +1,55 @@
+"""Compare two ``benchmarks.endpoints`` result files.
+
+Exits with status 1 when any benchmark regresses by more than the
+tolerance (fewer requests per second, higher p99 or slower class
+creation)::
+
+    python -m benchmarks.compare baseline.json results.json --tolerance 0.1
+"""
+import argparse
+import json
+import sys
+
+# metric -> True when higher is better
+METRICS = {'rps': True, 'p50_ms': False, 'p99_ms': False, 'us': False}
+GATED = {'rps', 'p99_ms', 'us'}
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def compare(baseline, current, tolerance):
+    rows, regressions = [], []
+    for name in sorted(baseline.keys() & current.keys()):
+        for metric, higher_is_better in METRICS.items():
+            if metric not in baseline[name] or metric not in current[name]:
+                continue
+            before, after = baseline[name][metric], current[name][metric]
+            change = (after - before) / before if before else 0.0
+            regressed = metric in GATED and (change < -tolerance if higher_is_better else change > tolerance)
+            rows.append((name, metric, before, after, change, regressed))
+            if regressed:
+                regressions.append(f'{name}.{metric}')
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    rows, regressions = compare(load(args.baseline), load(args.current), args.tolerance)
+    for name, metric, before, after, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f'{name:<32} {metric:<7} {before:>10.2f} -> {after:>10.2f} ({change:+.1%}){flag}')
+    if regressions:
+        print(f'{len(regressions)} regression(s): {", ".join(regressions)}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Throughput and latency of generated viewset endpoints.
+
+Builds a ``ViewSet`` per model from ``benchmarks.models`` and drives
+retrieve, list (several page sizes and filter mixes), create, update and
+delete through httpx's ASGI transport. It also times ``ViewSetMeta``
+class creation. It needs ``httpx`` and the Postgres used by the test suite
+(``DB_HOST``, ``DB_PORT``, ... as in ``tests/models.py``)::
+
+    python -m benchmarks.endpoints --output results.json
+    python -m benchmarks.compare baseline.json results.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import timeit
+
+import httpx
+from fastapi import FastAPI
+from gino import create_engine
+
+from fastapi_gino_viewsets import MainRouter
+from fastapi_gino_viewsets.viewsets import ViewSet
+from tests.models import PG_URL
+
+from .models import MODELS, db, make_payload, make_row
+
+PAGE_SIZES = (10, 100, 1000)
+FILTERS = {
+    'narrow': {
+        'name': 'name=name-7',
+        'ids': '&'.join(f'id={i}' for i in range(1, 51)),
+        'name_sorted': 'name=name-7&sort=-value',
+    },
+    'wide': {
+        'name': 'name=name-7',
+        'column': 'field_0=0',
+        'name_sorted': 'name=name-7&sort=-field_2',
+    },
+    'jsonb': {
+        'property': 'author=author-7',
+        'range': 'score__ge=90',
+        'mixed': 'author=author-7&score__ge=50&sort=-id',
+    },
+}
+UPDATE_FIELDS = {'narrow': 'name', 'wide': 'name', 'jsonb': 'title'}
+
+
+def make_viewset(model):
+    return type(f'{model.__name__}ViewSet', (ViewSet,), {'model': model, 'filter_schema': None})
+
+
+def make_app():
+    app = FastAPI()
+    router = MainRouter()
+    for name, model in MODELS.items():
+        router.add_view(f'/{name}')(make_viewset(model))
+    app.include_router(router)
+    return app
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, round(q * (len(values) - 1)))]
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def measure(client, send, requests, concurrency):
+    latencies = []
+    indexes = iter(range(requests))
+
+    async def worker():
+        for index in indexes:
+            started_at = time.perf_counter()
+            response = await send(client, index)
+            latencies.append(time.perf_counter() - started_at)
+            if response.status_code >= 400:
+                raise RuntimeError(f'{response.request.method} {response.request.url}: {response.text}')
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started_at)
+
+
+def make_scenarios(name, rows, created):
+    def get(url):
+        return lambda client, index: client.get(url(index))
+
+    async def create(client, index):
+        response = await client.post(f'/{name}', json=make_payload(name, rows + index))
+        created.append(response.json()['id'])
+        return response
+
+    async def update(client, index):
+        return await client.patch(f'/{name}/{1 + index % rows}', json={UPDATE_FIELDS[name]: f'updated-{index}'})
+
+    async def delete(client, index):
+        return await client.delete(f'/{name}/{created[index]}')
+
+    scenarios = {'retrieve': get(lambda index: f'/{name}/{1 + index % rows}')}
+    for size in PAGE_SIZES:
+        scenarios[f'list_{size}'] = get(lambda index, size=size: f'/{name}?limit={size}&offset={index * size % rows}')
+    for filter_name, query in FILTERS[name].items():
+        scenarios[f'filter_{filter_name}'] = get(lambda index, query=query: f'/{name}?limit=100&{query}')
+    scenarios.update(create=create, update=update, delete=delete)
+    return scenarios
+
+
+def measure_class_creation(number):
+    results = {}
+    for name, model in MODELS.items():
+        seconds = min(timeit.repeat(lambda: make_viewset(model), number=number, repeat=5)) / number
+        results[f'class_creation.{name}'] = {'us': seconds * 1e6}
+    return results
+
+
+async def measure_endpoints(rows, requests, concurrency, warmup):
+    engine = await create_engine(PG_URL, min_size=concurrency, max_size=concurrency)
+    db.bind = engine
+    results = {}
+    try:
+        await db.gino.drop_all()
+        await db.gino.create_all()
+        for name, model in MODELS.items():
+            await db.status(model.insert(), [make_row(name, index) for index in range(rows)])
+        transport = httpx.ASGITransport(app=make_app())
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+            for name in MODELS:
+                created = []
+                for scenario, send in make_scenarios(name, rows, created).items():
+                    if warmup and scenario not in ('create', 'delete'):
+                        await measure(client, send, warmup, concurrency)
+                    count = len(created) if scenario == 'delete' else requests
+                    results[f'{name}.{scenario}'] = result = await measure(client, send, count, concurrency)
+                    print(f'{name}.{scenario:<18} {result["rps"]:>9.1f} rps '
+                          f'p50 {result["p50_ms"]:>7.2f} ms  p99 {result["p99_ms"]:>7.2f} ms', file=sys.stderr)
+        await db.gino.drop_all()
+    finally:
+        await engine.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--class-creation', type=int, default=200, help='classes created per timing round')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    results = measure_class_creation(args.class_creation)
+    results.update(asyncio.run(measure_endpoints(args.rows, args.requests, args.concurrency, args.warmup)))
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.time(),
+            'rows': args.rows,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Per-request cost of turning a filter object into a WHERE clause.
+
+Compares the precompiled filter plan with the previous per-request
+``asdict`` + ``_handler_filter`` path. No database is needed::
+
+    python -m benchmarks.filter_plan
+"""
+import timeit
+from dataclasses import asdict
+from typing import Iterable
+
+import sqlalchemy as sa
+from sqlalchemy.sql import operators as op
+
+from fastapi_gino_viewsets.viewsets import ReadOnlyViewSet
+from tests.models import User
+
+
+class UserViewSet(ReadOnlyViewSet):
+    model = User
+
+
+def legacy_handler_filter(model, field_name, value):
+    field_name, _, method = field_name.partition('__')
+    field = getattr(model, field_name)
+    if method:
+        return getattr(op, method)(field, value)
+    if isinstance(value, Iterable) and not isinstance(value, str):
+        if issubclass(field.type.python_type, (dict, list)):
+            return field.contains(value)
+        return field.in_(value)
+    if value is None or isinstance(value, bool):
+        return field.is_(value)
+    return op.eq(field, value)
+
+
+def legacy_filter_query(query, filter_schema):
+    return query.where(sa.and_(
+        legacy_handler_filter(User, field_name, value)
+        for field_name, value in asdict(filter_schema).items() if value is not None
+    ))
+
+
+def main(number=20000):
+    filters = UserViewSet.filter_schema(
+        id=[1, 2, 3], nickname='Alex', age__le=30, team_id=[1], email_list=['user@gmail.com'],
+    )
+    query = User.query
+    cases = {
+        'legacy': lambda: legacy_filter_query(query, filters),
+        'plan': lambda: UserViewSet.filter_query(None, query, filters),
+    }
+    results = {}
+    for name, case in cases.items():
+        results[name] = min(timeit.repeat(case, number=number, repeat=5)) / number * 1e6
+        print(f'{name:>8}: {results[name]:.2f} us/request')
+    print(f' speedup: {results["legacy"] / results["plan"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
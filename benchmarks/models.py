@@ -0,0 +1,75 @@
+"""Representative models for the endpoint benchmarks.
+
+``Narrow`` is a handful of scalar columns, ``Wide`` has 32 columns and
+``Document`` keeps most of its data in JSONB properties and a free-form
+JSONB payload.
+"""
+from datetime import datetime
+
+from gino import Gino
+from sqlalchemy.dialects.postgresql import JSONB
+
+db = Gino()
+
+WIDE_COLUMNS = 30
+
+
+class Narrow(db.Model):
+    __tablename__ = 'bench_narrow'
+
+    id = db.Column(db.BigInteger(), primary_key=True)
+    name = db.Column(db.String(), nullable=False)
+    value = db.Column(db.Integer(), nullable=False, default=0)
+
+
+Wide = type('Wide', (db.Model,), {
+    '__tablename__': 'bench_wide',
+    'id': db.Column(db.BigInteger(), primary_key=True),
+    'name': db.Column(db.String(), nullable=False),
+    **{f'field_{i}': db.Column(db.String() if i % 2 else db.Integer()) for i in range(WIDE_COLUMNS)},
+})
+
+
+class Document(db.Model):
+    __tablename__ = 'bench_documents'
+
+    id = db.Column(db.BigInteger(), primary_key=True)
+    title = db.Column(db.String(), nullable=False)
+    payload = db.Column(JSONB(), nullable=False, server_default='{}')
+
+    profile = db.Column('props', JSONB(), nullable=False, server_default='{}')
+    author = db.StringProperty()
+    score = db.IntegerProperty(default=0)
+    published = db.DateTimeProperty(default=lambda i: datetime.utcfromtimestamp(0))
+    tags = db.ArrayProperty()
+
+
+MODELS = {'narrow': Narrow, 'wide': Wide, 'jsonb': Document}
+
+
+def make_row(name, index):
+    if name == 'narrow':
+        return {'name': f'name-{index % 50}', 'value': index}
+    if name == 'wide':
+        return {
+            'name': f'name-{index % 50}',
+            **{f'field_{i}': f'value-{index}-{i}' if i % 2 else index * i for i in range(WIDE_COLUMNS)},
+        }
+    return {
+        'title': f'title-{index}',
+        'payload': {'index': index, 'nested': {'items': list(range(index % 10)), 'flag': bool(index % 2)}},
+        'props': {
+            'author': f'author-{index % 50}',
+            'score': index % 100,
+            'published': datetime.utcfromtimestamp(index * 3600).isoformat(),
+            'tags': [f'tag-{index % 7}', f'tag-{index % 11}'],
+        },
+    }
+
+
+def make_payload(name, index):
+    row = make_row(name, index)
+    if name == 'jsonb':
+        props = row.pop('props')
+        row.update(props)
+    return row
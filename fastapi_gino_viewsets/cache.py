@@ -0,0 +1,56 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+__all__ = ['BaseCacheBackend', 'LRUCacheBackend', 'default_cache_backend']
+
+
+class BaseCacheBackend:
+
+    async def get(self, key: str):
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class LRUCacheBackend(BaseCacheBackend):
+
+    def __init__(self, maxsize: int = 1024, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.timer = timer
+        self._data = OrderedDict()
+        self._counters = {}
+
+    async def get(self, key: str):
+        if key in self._counters:
+            return self._counters[key]
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= self.timer():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        expires_at = None if ttl is None else self.timer() + ttl
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+default_cache_backend = LRUCacheBackend()
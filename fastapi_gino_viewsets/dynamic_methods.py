@@ -2,7 +2,25 @@ import asyncio
 from functools import wraps
 from typing import List, Optional
 
-from fastapi import Depends, Path, Query, Request
+import sqlalchemy as sa
+from fastapi import Depends, HTTPException, Path, Query, Request, status
+
+from .instrumentation import phase, record_rows
+from .routing import route_query
+from .slow_queries import log_query
+from .schemas import CountStrategy, ExportFormat
+from .utils import (
+    chunked,
+    copy_many,
+    decode_cursor,
+    encode_cursor,
+    get_insert_values,
+    get_object_or_404,
+    get_object_query,
+    get_objects_by_keys,
+    get_update_values,
+    insert_many,
+)
 
 
 def wrap_schema(fn, wrapped_key):
@@ -25,6 +43,23 @@ class MethodFactory:
             return wrap_schema(create, wrapped_key)
         return create
 
+    @classmethod
+    def make_bulk_create(cls, schema, wrapped_key: Optional[str] = None):
+        async def bulk_create(cls, request: List[schema]):
+            rows = [get_insert_values(cls.model, item.dict()) for item in request]
+            async with cls.model.__metadata__.transaction() as tx:
+                if not cls.bulk_create_returning:
+                    for chunk in chunked(rows, cls.bulk_create_chunk_size):
+                        await copy_many(tx.connection, cls.model, chunk)
+                    return {'count': len(rows)}
+                entities = []
+                for chunk in chunked(rows, cls.bulk_create_chunk_size):
+                    entities.extend(await insert_many(cls.model, chunk))
+            if wrapped_key is not None:
+                return [{wrapped_key: entity} for entity in entities]
+            return entities
+        return bulk_create
+
     @classmethod
     def make_update(cls, schema, key_name, key_type, wrapped_key: Optional[str] = None):
         async def update(
@@ -33,9 +68,11 @@ class MethodFactory:
                 param: key_type = Path(..., alias=key_name),
         ):
             field = getattr(cls.model, cls.key_name)
+            updated_fields = cls.get_put_schema().from_orm(request).dict(exclude_unset=True)
+            if updated_fields and cls.retrieve_function is get_object_or_404:
+                return await cls.update_function(cls.model, where=field == param, values=updated_fields)
             entity = await cls.retrieve_function(cls.model, where=field == param)
-            updated_fields = cls.get_put_schema().from_orm(request)
-            await entity.update(**updated_fields.dict(exclude_unset=True)).apply()
+            await entity.update(**updated_fields).apply()
             return entity
         if wrapped_key is not None:
             return wrap_schema(update, wrapped_key)
@@ -49,18 +86,53 @@ class MethodFactory:
                 param: key_type = Path(..., alias=key_name),
         ):
             field = getattr(cls.model, cls.key_name)
+            updated_fields = cls.get_patch_schema().from_orm(request).dict(exclude_defaults=True)
+            if updated_fields and cls.retrieve_function is get_object_or_404:
+                return await cls.update_function(cls.model, where=field == param, values=updated_fields)
             entity = await cls.retrieve_function(cls.model, where=field == param)
-            updated_fields = cls.get_patch_schema().from_orm(request)
-            await entity.update(**updated_fields.dict(exclude_defaults=True)).apply()
+            await entity.update(**updated_fields).apply()
             return entity
         if wrapped_key is not None:
             return wrap_schema(update_partial, wrapped_key)
         return update_partial
 
+    @classmethod
+    def make_update_partial_list(cls, schema, filter_schema, wrapped_key: Optional[str] = None):
+        async def update_partial_list(
+                cls,
+                request: schema,
+                http_request: Request,
+                filters: filter_schema = Depends(filter_schema),
+        ):
+            if not cls.get_filters(filters):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail='At least one filter is required',
+                )
+            updated_fields = cls.get_patch_schema().from_orm(request).dict(exclude_defaults=True)
+            if not updated_fields:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail='Nothing to update',
+                )
+            field = getattr(cls.model, cls.key_name)
+            query = cls.filter_query(
+                http_request, cls.model.update.values(**get_update_values(cls.model, updated_fields)), filters,
+            )
+            rows = await query.returning(field).gino.return_model(False).all()
+            keys = [row[0] for row in rows]
+            return {'count': len(keys), 'keys': keys}
+        if wrapped_key is not None:
+            return wrap_schema(update_partial_list, wrapped_key)
+        return update_partial_list
+
     @classmethod
     def make_delete(cls, key_name, key_type, wrapped_key: Optional[str] = None):
         async def delete(cls, param: key_type = Path(..., alias=key_name)):
             field = getattr(cls.model, cls.key_name)
+            if cls.retrieve_function is get_object_or_404:
+                key_value = await cls.delete_function(cls.model, where=field == param, returning=field)
+                return {key_name: key_value}
             entity = await cls.retrieve_function(cls.model, where=field == param)
             key_value = getattr(entity, key_name)
             await entity.delete()
@@ -69,52 +141,242 @@ class MethodFactory:
             return wrap_schema(delete, wrapped_key)
         return delete
 
+    @classmethod
+    def make_delete_list(cls, schema, wrapped_key: Optional[str] = None):
+        async def delete_list(cls, request: Request, filters: schema = Depends(schema)):
+            if not cls.get_filters(filters):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail='At least one filter is required',
+                )
+            field = getattr(cls.model, cls.key_name)
+            query = cls.filter_query(request, cls.model.delete, filters).returning(field)
+            keys = [row[0] for row in await query.gino.return_model(False).all()]
+            return {'count': len(keys), 'keys': keys}
+        if wrapped_key is not None:
+            return wrap_schema(delete_list, wrapped_key)
+        return delete_list
+
     @classmethod
     def make_retrieve(cls, key_name, key_type, wrapped_key: Optional[str] = None):
         async def retrieve(
                 cls,
                 request: Request,
                 param: key_type = Path(..., alias=key_name),
+                fields: Optional[str] = None,
+                expand: Optional[str] = None,
         ):
             field = getattr(cls.model, cls.key_name)
-            entity = await cls.retrieve_function(cls.model, where=field == param)
+            if getattr(cls, 'etag_column', None) is not None:
+                not_modified = await cls.check_validator(request, route_query(cls.model.query.where(field == param)))
+                if not_modified is not None:
+                    return not_modified
+            if cls.retrieve_function is get_object_or_404:
+                query = cls.cached_query(
+                    cls.get_query_shape(request, 'retrieve'),
+                    lambda: get_object_query(
+                        cls.model, where=field == sa.bindparam('key', param), columns=cls.get_columns(request),
+                    ),
+                )
+                with phase('fetch', statements=1):
+                    async with log_query('get_object_or_404', query):
+                        entity = await get_object_or_404(cls.model, query=query)
+            else:
+                with phase('fetch', statements=1):
+                    entity = await cls.retrieve_function(cls.model, where=field == param)
+            record_rows(1)
+            if expand:
+                with phase('expand'):
+                    await cls.expand_data(request, [entity], expand)
             return entity
         if wrapped_key is not None:
             return wrap_schema(retrieve, wrapped_key)
         return retrieve
 
     @classmethod
-    def make_retrieve_list(cls, schema, wrapped_key: Optional[str] = None):
+    def make_retrieve_batch(cls, key_name, key_type, wrapped_key: Optional[str] = None):
+        async def retrieve_batch(
+                cls,
+                request: Request,
+                keys: List[key_type] = Query(..., alias=key_name),
+                fields: Optional[str] = None,
+                expand: Optional[str] = None,
+        ):
+            if len(keys) > cls.batch_max_size:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f'At most {cls.batch_max_size} keys are allowed',
+                )
+            field = getattr(cls.model, cls.key_name)
+            with phase('fetch', statements=1):
+                data, missing = await get_objects_by_keys(
+                    cls.model, field, keys, columns=cls.get_columns(request), query=route_query(cls.model.query),
+                )
+            record_rows(len(data))
+            if expand:
+                with phase('expand'):
+                    await cls.expand_data(request, data, expand)
+            if wrapped_key is not None:
+                data = [{wrapped_key: entity} for entity in data]
+            return {'data': data, 'missing': missing}
+        return retrieve_batch
+
+    @classmethod
+    def make_retrieve_list(cls, schema, limit_query=Query(0, ge=0), wrapped_key: Optional[str] = None):
+        async def retrieve_list(
+            cls,
+            request: Request,
+            *,
+            offset: int = Query(0, ge=0),
+            limit: int = limit_query,
+            with_total: bool = True,
+            sort: List[str] = Query(None),
+            fields: Optional[str] = None,
+            expand: Optional[str] = None,
+            filters: schema = Depends(schema),
+        ):
+            requested_limit, limit = limit, cls.get_limit(limit)
+            with phase('get_query'):
+                query = cls.get_query(request, filters)
+                if asyncio.iscoroutine(query):
+                    query = await query
+                query = route_query(query)
+            if filters:
+                with phase('filter'):
+                    query = cls.filter_query(request, query, filters)
+            if sort is not None:
+                with phase('sort'):
+                    query = cls.sort_query(request, query, sort)
+            if filters and cls.search_rank:
+                with phase('sort'):
+                    query = cls.rank_query(request, query, filters)
+            if getattr(cls, 'etag_column', None) is not None:
+                not_modified = await cls.check_validator(request, query)
+                if not_modified is not None:
+                    return not_modified
+            count_strategy = CountStrategy(cls.count_strategy) if with_total else CountStrategy.none
+            filter_values = cls.get_filters(filters) if filters else []
+            shape = cls.get_query_shape(request, 'retrieve_list', cls.get_filters_shape(filter_values))
+            total = None
+            if count_strategy is CountStrategy.exact:
+                with phase('total', statements=1):
+                    if cls.is_default_method('total'):
+                        total_query = cls.cached_query(('total', *shape), lambda: cls.total_query(query))
+                        async with log_query('total', total_query):
+                            total = await total_query.gino.scalar()
+                    else:
+                        async with log_query('total', query):
+                            total = await cls.total(query)
+            elif count_strategy is CountStrategy.estimate:
+                with phase('total', statements=1):
+                    total = await cls.estimate_total(query)
+            elif count_strategy is CountStrategy.window:
+                query = cls.window_total_query(query)
+            with phase('paginate'):
+                data_query = cls.cached_query(
+                    (count_strategy, bool(limit), *shape),
+                    lambda: cls.paginate(query, offset, limit),
+                    {'offset': offset, 'limit': limit},
+                )
+            with phase('fetch', statements=1):
+                async with log_query('prepare_data_hook', data_query):
+                    data = list(await cls.prepare_data_hook(data_query))
+            record_rows(len(data))
+            if expand:
+                with phase('expand'):
+                    await cls.expand_data(request, data, expand)
+            if count_strategy is CountStrategy.window:
+                with phase('total'):
+                    total = await cls.window_total(query, data, offset)
+            requested_limit = requested_limit if requested_limit != limit else None
+            return cls.prepare_response(data, offset, limit, total, count_strategy, requested_limit)
+        return retrieve_list
+
+    @classmethod
+    def make_retrieve_cursor_list(cls, schema, limit_query=Query(0, ge=0)):
         async def retrieve_list(
             cls,
             request: Request,
             *,
-            offset: int = 0,
-            limit: int = 0,
+            cursor: Optional[str] = None,
+            limit: int = limit_query,
+            sort: List[str] = Query(None),
+            fields: Optional[str] = None,
+            expand: Optional[str] = None,
+            filters: schema = Depends(schema),
+        ):
+            requested_limit, limit = limit, cls.get_limit(limit)
+            with phase('get_query'):
+                query = cls.get_query(request, filters)
+                if asyncio.iscoroutine(query):
+                    query = await query
+                query = route_query(query)
+            if filters:
+                with phase('filter'):
+                    query = cls.filter_query(request, query, filters)
+            cursor_fields = cls.get_cursor_fields(request, query, sort)
+            filter_values = cls.get_filters(filters) if filters else []
+            shape = cls.get_query_shape(request, 'retrieve_cursor_list', cls.get_filters_shape(filter_values))
+            with phase('paginate'):
+                if cursor is not None:
+                    values = decode_cursor(cursor)
+                    query = cls.seek_query(request, query, cursor_fields, values)
+                query = cls.sort_query_by_cursor_fields(query, cursor_fields)
+                data_query = cls.cached_query(
+                    (cursor is not None, bool(limit), *shape),
+                    lambda: cls.paginate(query, 0, limit and limit + 1),
+                    {'offset': 0, 'limit': limit and limit + 1},
+                )
+            with phase('fetch', statements=1):
+                async with log_query('prepare_data_hook', data_query):
+                    data = list(await cls.prepare_data_hook(data_query))
+            next_cursor = None
+            if limit and len(data) > limit:
+                data = data[:limit]
+                next_cursor = encode_cursor(getattr(data[-1], name) for name, _, _ in cursor_fields)
+            record_rows(len(data))
+            if expand:
+                with phase('expand'):
+                    await cls.expand_data(request, data, expand)
+            requested_limit = requested_limit if requested_limit != limit else None
+            return cls.prepare_cursor_response(data, limit, next_cursor, requested_limit)
+        return retrieve_list
+
+    @classmethod
+    def make_export(cls, schema):
+        async def export(
+            cls,
+            request: Request,
+            *,
+            export_format: ExportFormat = Query(ExportFormat.ndjson, alias='format'),
             sort: List[str] = Query(None),
+            fields: Optional[str] = None,
             filters: schema = Depends(schema),
         ):
             query = cls.get_query(request, filters)
             if asyncio.iscoroutine(query):
                 query = await query
+            query = route_query(query)
             if filters:
                 query = cls.filter_query(request, query, filters)
             if sort is not None:
                 query = cls.sort_query(request, query, sort)
-            total = await cls.total(query)
-            query = cls.paginate(query, offset, limit)
-            data = list(await cls.prepare_data_hook(query))
-            return cls.prepare_response(data, offset, limit, total)
-        return retrieve_list
+            return cls.prepare_export_response(query, export_format, fields)
+        return export
 
     @classmethod
     def make_retrieve_single_object_data(cls, schema):
         async def retrieve_single_object_data(cls, request: Request, filters: schema = Depends(schema)):
-            query = cls.get_query(request, filters)
-            if asyncio.iscoroutine(query):
-                query = await query
+            with phase('get_query'):
+                query = cls.get_query(request, filters)
+                if asyncio.iscoroutine(query):
+                    query = await query
+                query = route_query(query)
             if filters:
-                query = cls.filter_query(request, query, filters)
-            data = await query.gino.first()
+                with phase('filter'):
+                    query = cls.filter_query(request, query, filters)
+            with phase('fetch', statements=1):
+                data = await query.gino.first()
+            record_rows(int(data is not None))
             return data
         return retrieve_single_object_data
@@ -0,0 +1,293 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+import sqlalchemy as sa
+from gino.json_support import ArrayProperty, ObjectProperty
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.sql.elements import Cast
+
+from .lazy import get_view_name
+from .utils import get_filter_field, get_json_property, get_model_column
+
+__all__ = [
+    'IndexAdvice',
+    'IndexAdvisor',
+    'IndexDef',
+    'get_database_indexes',
+    'get_declared_indexes',
+    'is_filter_indexed',
+    'is_sort_indexed',
+    'parse_index_definition',
+]
+DIALECT = postgresql.dialect()
+RANGE_METHODS = ('', 'lt', 'gt', 'le', 'ge')
+KEY_METHODS = ('has', 'has_any', 'has_all')
+KEY_SUFFIX = re.compile(r'\s+(?:ASC|DESC|NULLS\s+(?:FIRST|LAST)|COLLATE\s+\S+)\s*$', re.IGNORECASE)
+OPCLASS_SUFFIX = re.compile(r'\s+(\w+_ops)\s*$')
+PG_INDEXES = sa.table(
+    'pg_indexes', sa.column('schemaname'), sa.column('tablename'), sa.column('indexname'), sa.column('indexdef'),
+)
+
+
+class IndexDef(NamedTuple):
+    name: str
+    method: str
+    keys: Tuple[str, ...]
+    opclasses: Tuple[Optional[str], ...]
+
+
+class IndexRequirement(NamedTuple):
+    method: str
+    expression: str
+    key_ops: bool = False
+    indexable: bool = True
+    name: Optional[str] = None
+
+    @property
+    def key(self):
+        return normalize_expression(self.expression)
+
+
+class IndexAdvice(NamedTuple):
+    view: str
+    filters: Tuple[str, ...]
+    sort: Tuple[str, ...]
+    ddl: str
+
+
+def normalize_expression(expression: str) -> str:
+    """Comparable form of an index key, e.g. ``((props ->> 'age'::text))::integer`` -> ``props->>'age'::integer``"""
+    expression = re.sub(r'^CAST\((.*) AS ([\w ]+)\)$', r'(\1)::\2', expression.strip(), flags=re.IGNORECASE)
+    expression = re.sub(r'::(?:text|regconfig|character varying)\b(?!\[)', '', expression)
+    return re.sub(r'[\s"()]', '', expression).lower()
+
+
+def split_index_keys(keys: str):
+    depth, start, quoted = 0, 0, False
+    for position, char in enumerate(keys):
+        if char == "'":
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            yield keys[start:position].strip()
+            start = position + 1
+    yield keys[start:].strip()
+
+
+def _strip_key_options(key: str) -> str:
+    while KEY_SUFFIX.search(key):
+        key = KEY_SUFFIX.sub('', key)
+    return key
+
+
+def parse_index_key(key: str):
+    key = _strip_key_options(key)
+    match = OPCLASS_SUFFIX.search(key)
+    if match is None:
+        return normalize_expression(key), None
+    return normalize_expression(_strip_key_options(key[:match.start()])), match.group(1)
+
+
+def parse_index_definition(name: str, definition: str) -> Optional[IndexDef]:
+    """Parses ``pg_indexes.indexdef``; partial indexes (``WHERE ...``) are skipped"""
+    match = re.search(r'\sUSING\s+(\w+)\s*\(', definition)
+    if match is None:
+        return None
+    depth = 1
+    position = match.end()
+    while depth and position < len(definition):
+        depth += {'(': 1, ')': -1}.get(definition[position], 0)
+        position += 1
+    if re.search(r'\sWHERE\s', definition[position:], re.IGNORECASE):
+        return None
+    keys = [parse_index_key(key) for key in split_index_keys(definition[match.end():position - 1])]
+    return IndexDef(name, match.group(1).lower(), tuple(k for k, _ in keys), tuple(o for _, o in keys))
+
+
+def _compile_index_key(table, expression) -> str:
+    if isinstance(expression, sa.Column):
+        return expression.name
+    if isinstance(expression, str):
+        return table.c[expression].name if expression in table.c else expression
+    compiled = str(expression.compile(dialect=DIALECT, compile_kwargs={'literal_binds': True}))
+    return compiled.replace(f'{DIALECT.identifier_preparer.format_table(table)}.', '')
+
+
+@lru_cache(maxsize=None)
+def get_declared_indexes(table) -> tuple:
+    """Indexes declared in the model metadata: primary key, unique constraints and ``Index`` objects"""
+    indexes = [
+        IndexDef(constraint.name, 'btree', tuple(c.name for c in constraint.columns), (None,) * len(constraint.columns))
+        for constraint in table.constraints
+        if isinstance(constraint, (sa.PrimaryKeyConstraint, sa.UniqueConstraint)) and constraint.columns
+    ]
+    for index in table.indexes:
+        if index.dialect_options['postgresql']['where'] is not None:
+            continue
+        ops = index.dialect_options['postgresql']['ops'] or {}
+        keys = [_compile_index_key(table, expression) for expression in index.expressions]
+        indexes.append(IndexDef(
+            index.name,
+            (index.dialect_options['postgresql']['using'] or 'btree').lower(),
+            tuple(normalize_expression(key) for key in keys),
+            tuple(ops.get(key) for key in keys),
+        ))
+    return tuple(indexes)
+
+
+async def get_database_indexes(table, bind) -> list:
+    schema = table.schema if table.schema is not None else sa.func.current_schema()
+    query = sa.select([PG_INDEXES.c.indexname, PG_INDEXES.c.indexdef]).where(
+        sa.and_(PG_INDEXES.c.schemaname == schema, PG_INDEXES.c.tablename == table.name),
+    )
+    indexes = [parse_index_definition(name, definition) for name, definition in await bind.all(query)]
+    return [index for index in indexes if index is not None]
+
+
+def get_filter_requirement(model, field_name: str) -> Optional[IndexRequirement]:
+    attr_name, _, method = field_name.partition('__')
+    prop = get_json_property(model, attr_name)
+    column = get_model_column(model, attr_name)
+    if column is None or (method not in RANGE_METHODS and method not in KEY_METHODS):
+        return None
+    host = DIALECT.identifier_preparer.quote(column.name)
+    if prop is not None:
+        key = "'{}'".format(prop.name.replace("'", "''"))
+        if method in KEY_METHODS:
+            return IndexRequirement('gin', f'{host} -> {key}', key_ops=True)
+        if isinstance(prop, (ArrayProperty, ObjectProperty)):
+            return IndexRequirement('gin', host)
+        expression = get_filter_field(model, attr_name)
+        if isinstance(expression, Cast):
+            cast = expression.type.compile(dialect=DIALECT).lower()
+            # text to timestamp casts depend on DateStyle and can't be used in an index
+            return IndexRequirement('btree', f'({host} ->> {key})::{cast}', indexable=not isinstance(
+                expression.type, sa.DateTime,
+            ))
+        return IndexRequirement('btree', f'{host} ->> {key}')
+    if method in KEY_METHODS:
+        return IndexRequirement('gin', host, key_ops=True)
+    if not method and isinstance(column.type, (JSONB, ARRAY)):
+        return IndexRequirement('gin', host)
+    return IndexRequirement('btree', host)
+
+
+def get_sort_requirement(model, field_name: str) -> Optional[IndexRequirement]:
+    field_name = field_name.lstrip('-')
+    column = get_model_column(model, field_name)
+    if column is None or get_json_property(model, field_name) is not None or isinstance(column.type, JSONB):
+        return None
+    return IndexRequirement('btree', DIALECT.identifier_preparer.quote(column.name))
+
+
+def is_supported(requirement: Optional[IndexRequirement], indexes) -> bool:
+    if requirement is None or not requirement.indexable:
+        return False
+    key = requirement.key
+    for index in indexes:
+        if index.method != requirement.method:
+            continue
+        if index.method == 'btree':
+            if index.keys[:1] == (key,):
+                return True
+        elif key in index.keys:
+            if not requirement.key_ops or index.opclasses[index.keys.index(key)] != 'jsonb_path_ops':
+                return True
+    return False
+
+
+def is_filter_indexed(model, field_name: str, indexes=None) -> bool:
+    if indexes is None:
+        indexes = get_declared_indexes(model.__table__)
+    return is_supported(get_filter_requirement(model, field_name), indexes)
+
+
+def is_sort_indexed(model, field_name: str, indexes=None) -> bool:
+    if indexes is None:
+        indexes = get_declared_indexes(model.__table__)
+    return is_supported(get_sort_requirement(model, field_name), indexes)
+
+
+def make_index_ddl(table, requirement: IndexRequirement) -> str:
+    table_name = DIALECT.identifier_preparer.format_table(table)
+    if not requirement.indexable:
+        return f'-- {table_name} ({requirement.expression}) is not indexable, filter on a column instead'
+    suffix = requirement.name or re.sub(r'\W+', '_', requirement.key).strip('_')
+    name = DIALECT.identifier_preparer.quote(f'ix_{table.name}_{suffix}'[:63])
+    expression = requirement.expression
+    if not re.fullmatch(r'"?\w+"?', expression):
+        expression = f'({expression})'
+    return f'CREATE INDEX {name} ON {table_name} USING {requirement.method} ({expression});'
+
+
+def get_view_paths(view):
+    """Filter and sort paths exposed by a viewset: ``(kind, field_name, requirement)``"""
+    model = view.model
+    filter_schema = getattr(view, 'filter_schema', None)
+    if filter_schema is not None:
+        field_names = getattr(filter_schema, '__dataclass_fields__', None) or filter_schema.__fields__
+        for field_name in field_names:
+            yield 'filter', field_name, get_filter_requirement(model, field_name)
+    if hasattr(view, 'sort_query'):
+        for attr_name, column_name in model._column_name_map.items():
+            if get_json_property(model, attr_name) is None:
+                yield 'sort', attr_name, get_sort_requirement(model, column_name)
+    if hasattr(view, 'is_searchable') and view.is_searchable():
+        expression = _compile_index_key(model.__table__, view.get_search_vector())
+        yield 'filter', view.search_param, IndexRequirement('gin', expression, name='search')
+
+
+class IndexAdvisor:
+    """Reports viewset filter and sort paths not backed by an index of the database"""
+
+    def __init__(self):
+        self.advice = []
+
+    def advise_view(self, view, indexes) -> list:
+        grouped = {}
+        for kind, field_name, requirement in get_view_paths(view):
+            if requirement is None or is_supported(requirement, indexes):
+                continue
+            fields = grouped.setdefault(requirement, {'filter': [], 'sort': []})
+            fields[kind].append(field_name)
+        advice = [
+            IndexAdvice(
+                get_view_name(view), tuple(fields['filter']), tuple(fields['sort']),
+                make_index_ddl(view.model.__table__, requirement),
+            )
+            for requirement, fields in grouped.items()
+        ]
+        self.advice.extend(advice)
+        return advice
+
+    async def check(self, views, bind=None) -> list:
+        tables = {}
+        advice = []
+        for view in views:
+            model = getattr(view, 'model', None)
+            if model is None:
+                continue
+            table = model.__table__
+            if table not in tables:
+                tables[table] = await get_database_indexes(table, bind or model.__metadata__.bind)
+            advice.extend(self.advise_view(view, tables[table]))
+        return advice
+
+    def render(self) -> str:
+        lines = []
+        for view, filters, sort, ddl in self.advice:
+            paths = [
+                f'{kind} by {", ".join(fields)}' for kind, fields in (('filter', filters), ('sort', sort)) if fields
+            ]
+            lines.append(f'{view}: {" and ".join(paths)} without index\n    {ddl}')
+        return '\n'.join(lines)
+
+    def clear(self):
+        self.advice.clear()
@@ -0,0 +1,142 @@
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from starlette.responses import PlainTextResponse
+
+__all__ = [
+    'BaseInstrumentationHook',
+    'PrometheusHook',
+    'Trace',
+    'current_trace',
+    'default_prometheus_hook',
+    'phase',
+    'record_rows',
+    'record_statement',
+]
+
+current_trace = ContextVar('current_trace', default=None)
+
+
+class Trace:
+    __slots__ = ('view', 'name', 'phases', 'rows', 'statements', 'bytes', 'duration', '_started_at')
+
+    def __init__(self, view: str, name: str):
+        self.view = view
+        self.name = name
+        self.phases = {}
+        self.rows = 0
+        self.statements = 0
+        self.bytes = 0
+        self.duration = None
+        self._started_at = time.perf_counter()
+
+    def add(self, name: str, duration: float, statements: int = 0):
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+        self.statements += statements
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._started_at
+
+    @property
+    def server_timing(self) -> str:
+        timings = [*self.phases.items(), ('app', self.duration or 0.0)]
+        return ', '.join(f'{name};dur={duration * 1000:.2f}' for name, duration in timings)
+
+
+class phase:
+    __slots__ = ('name', 'statements', 'trace', 'started_at')
+
+    def __init__(self, name: str, statements: int = 0):
+        self.name = name
+        self.statements = statements
+        self.trace = None
+        self.started_at = None
+
+    def __enter__(self):
+        self.trace = current_trace.get()
+        if self.trace is not None:
+            self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.trace is not None:
+            self.trace.add(self.name, time.perf_counter() - self.started_at, self.statements)
+
+
+def record_rows(count: int):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.rows += count
+
+
+def record_statement(count: int = 1):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.statements += count
+
+
+class BaseInstrumentationHook:
+
+    def record(self, trace: Trace):
+        raise NotImplementedError
+
+
+class PrometheusHook(BaseInstrumentationHook):
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, prefix: str = 'viewset'):
+        self.prefix = prefix
+        self.requests = defaultdict(lambda: [0] * (len(self.buckets) + 2))
+        self.phases = defaultdict(lambda: [0, 0.0])
+        self.counters = defaultdict(int)
+
+    def record(self, trace: Trace):
+        labels = (trace.view, trace.name)
+        histogram = self.requests[labels]
+        for index, bucket in enumerate(self.buckets):
+            if trace.duration <= bucket:
+                histogram[index] += 1
+        histogram[-2] += 1
+        histogram[-1] += trace.duration
+        for name, duration in trace.phases.items():
+            summary = self.phases[(*labels, name)]
+            summary[0] += 1
+            summary[1] += duration
+        self.counters[('rows', *labels)] += trace.rows
+        self.counters[('statements', *labels)] += trace.statements
+        self.counters[('serialized_bytes', *labels)] += trace.bytes
+
+    def render(self) -> str:
+        prefix = self.prefix
+        lines = [
+            f'# HELP {prefix}_request_duration_seconds Generated handler latency.',
+            f'# TYPE {prefix}_request_duration_seconds histogram',
+        ]
+        for (view, name), histogram in sorted(self.requests.items()):
+            labels = f'view="{view}",method="{name}"'
+            for bucket, count in zip(self.buckets, histogram):
+                lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="{bucket}"}} {count}')
+            lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram[-2]}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{{labels}}} {histogram[-2]}')
+            lines.append(f'{prefix}_request_duration_seconds_sum{{{labels}}} {histogram[-1]}')
+        lines += [
+            f'# HELP {prefix}_phase_duration_seconds Time spent in each handler phase.',
+            f'# TYPE {prefix}_phase_duration_seconds summary',
+        ]
+        for (view, name, phase_name), (count, total) in sorted(self.phases.items()):
+            labels = f'view="{view}",method="{name}",phase="{phase_name}"'
+            lines.append(f'{prefix}_phase_duration_seconds_count{{{labels}}} {count}')
+            lines.append(f'{prefix}_phase_duration_seconds_sum{{{labels}}} {total}')
+        for metric in ('rows', 'statements', 'serialized_bytes'):
+            lines.append(f'# TYPE {prefix}_{metric}_total counter')
+            for (counter, view, name), value in sorted(self.counters.items()):
+                if counter == metric:
+                    lines.append(f'{prefix}_{metric}_total{{view="{view}",method="{name}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    async def endpoint(self):
+        return PlainTextResponse(self.render(), media_type='text/plain; version=0.0.4')
+
+
+default_prometheus_hook = PrometheusHook()
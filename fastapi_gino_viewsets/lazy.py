@@ -0,0 +1,101 @@
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from weakref import WeakKeyDictionary
+
+__all__ = ['LazyAttribute', 'StartupReport', 'materialize', 'set_lazy', 'startup_report']
+
+
+def get_view_name(view) -> str:
+    return view if isinstance(view, str) else f'{view.__module__}.{view.__qualname__}'
+
+
+class StartupReport:
+
+    def __init__(self):
+        self.views = OrderedDict()
+        self._nested = []
+
+    @contextmanager
+    def measure(self, view, name: str):
+        self._nested.append(0.0)
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started_at
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            self.record(view, name, elapsed - nested)
+
+    def record(self, view, name: str, duration: float):
+        timings = self.views.setdefault(get_view_name(view), OrderedDict())
+        timings[name] = timings.get(name, 0.0) + duration
+
+    @property
+    def total(self) -> float:
+        return sum(sum(timings.values()) for timings in self.views.values())
+
+    def summary(self):
+        return sorted(
+            ((view, sum(timings.values()), dict(timings)) for view, timings in self.views.items()),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+    def render(self, limit: int = None) -> str:
+        lines = []
+        for view, total, timings in self.summary()[:limit]:
+            details = ', '.join(f'{name}={duration * 1000:.2f}' for name, duration in timings.items())
+            lines.append(f'{total * 1000:9.2f} ms  {view}  ({details})')
+        lines.append(f'{self.total * 1000:9.2f} ms  total for {len(self.views)} viewsets')
+        return '\n'.join(lines)
+
+    def clear(self):
+        self.views.clear()
+
+
+startup_report = StartupReport()
+
+
+class LazyAttribute:
+    """Class attribute built by ``build(cls)`` on first access from each class, so subclass overrides are used."""
+    __slots__ = ('build', 'owner', 'name', 'values')
+
+    def __init__(self, build):
+        self.build = build
+        self.owner = None
+        self.name = None
+        self.values = WeakKeyDictionary()
+
+    def __set_name__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    @property
+    def built(self) -> bool:
+        return self.owner in self.values
+
+    def __get__(self, instance, owner):
+        if owner not in self.values:
+            with startup_report.measure(owner, self.name):
+                self.values[owner] = self.build(owner)
+        value = self.values[owner]
+        if isinstance(value, classmethod):
+            return value.__get__(instance, owner)
+        return value
+
+
+def set_lazy(cls, name: str, build):
+    attribute = LazyAttribute(build)
+    attribute.__set_name__(cls, name)
+    setattr(cls, name, attribute)
+
+
+def materialize(view):
+    for klass in view.__mro__:
+        for name, value in list(vars(klass).items()):
+            if isinstance(value, LazyAttribute):
+                getattr(view, name)
+    return view
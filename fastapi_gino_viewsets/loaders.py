@@ -0,0 +1,45 @@
+from .instrumentation import record_statement
+from .routing import route_query
+
+__all__ = ['DataLoader', 'get_loader', 'get_relation']
+
+
+def get_relation(model, related):
+    related_model, fk_name = related if isinstance(related, tuple) else (related, None)
+    for column in model.__table__.columns:
+        attr_name = model._column_name_map.invert_get(column.name, column.name)
+        if fk_name is not None and attr_name != fk_name:
+            continue
+        for foreign_key in column.foreign_keys:
+            if foreign_key.column.table is related_model.__table__:
+                return attr_name, related_model, foreign_key.column
+    raise ValueError(f'{model.__name__} has no foreign key to {related_model.__name__}')
+
+
+class DataLoader:
+
+    def __init__(self, model, column):
+        self.model = model
+        self.column = column
+        self.attr_name = model._column_name_map.invert_get(column.name, column.name)
+        self.cache = {}
+
+    async def load_many(self, keys):
+        missing = [key for key in dict.fromkeys(keys) if key is not None and key not in self.cache]
+        if missing:
+            record_statement()
+            for obj in await route_query(self.model.query).where(self.column.in_(missing)).gino.all():
+                self.cache[getattr(obj, self.attr_name)] = obj
+            for key in missing:
+                self.cache.setdefault(key, None)
+        return [None if key is None else self.cache[key] for key in keys]
+
+
+def get_loader(request, model, column):
+    loaders = getattr(request.state, 'loaders', None)
+    if loaders is None:
+        loaders = request.state.loaders = {}
+    loader = loaders.get(column)
+    if loader is None:
+        loader = loaders[column] = DataLoader(model, column)
+    return loader
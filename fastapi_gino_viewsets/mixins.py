@@ -1,26 +1,95 @@
-from dataclasses import asdict
-from typing import Iterable
+import hashlib
+import inspect
+import json
+from datetime import datetime
+from functools import wraps
+from typing import Iterable, List
+from urllib.parse import urlencode
 
 import sqlalchemy as sa
+from gino.json_support import ArrayProperty, ObjectProperty
 from ginodantic import BaseModelSchema
 from pydantic import BaseModel
 from sqlalchemy import asc, desc
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.sql import ClauseElement, operators as op
 from starlette import status
+from fastapi import HTTPException, Query
 from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
 
-from .schemas import BaseDeleteSchema, BaseSchema, BasePaginatedListSchema
+from .cache import default_cache_backend
+from .schemas import (
+    BaseBatchSchema,
+    BaseBulkSchema,
+    BaseCursorPaginatedListSchema,
+    BaseDeleteSchema,
+    BasePaginatedListSchema,
+    BaseSchema,
+    CountStrategy,
+    ExportFormat,
+)
 from .dynamic_methods import MethodFactory
+from .indexes import is_sort_indexed
+from .instrumentation import Trace, current_trace, default_prometheus_hook
+from .lazy import LazyAttribute, set_lazy, startup_report
+from .loaders import get_loader, get_relation
+from .query_cache import CompiledQuery, get_compiled_params
+from .routing import current_bind, get_read_bind, route_query
 from .schema_factory import SchemaFactory
-from .utils import is_method_overloaded, get_object_or_404
+from .serialization import (
+    ResponseRenderer,
+    SchemaSerializer,
+    SerializedResponse,
+    dumps,
+    dumps_csv_rows,
+    make_serializer,
+    serialize,
+)
+from .slow_queries import QueryContext, current_query_context, default_slow_query_log
+from .utils import (
+    Explain,
+    add_hidden_param,
+    delete_object_or_404,
+    get_model_column,
+    get_object_or_404,
+    get_filter_field,
+    get_json_property,
+    get_schema_columns,
+    get_schema_prefix,
+    get_static_attr,
+    http_date,
+    is_method_overloaded,
+    is_not_modified,
+    make_etag,
+    make_search_vector,
+    parse_fields,
+    sql_literal,
+    update_object_or_404,
+)
+
+WINDOW_TOTAL_LABEL = '_window_total'
+CACHED_QUERY_METHODS = (
+    'get_query', 'filter_query', 'sort_query', 'paginate', 'total_query', 'total', 'prepare_data_hook',
+)
 
 __all__ = [
     'AggregateObjectMixin',
+    'BatchRetrieveModelMixin',
+    'BulkCreateModelMixin',
+    'BulkDeleteModelMixin',
+    'BulkUpdatePartialModelMixin',
+    'CacheMixin',
     'CreateModelMixin',
     'DeleteModelMixin',
+    'ETagMixin',
+    'ExportMixin',
+    'InstrumentationMixin',
     'BaseListModelMixin',
     'ListModelMixin',
+    'ReadReplicaMixin',
     'RetrieveModelMixin',
+    'SlowQueryLogMixin',
     'UpdateModelMixin',
     'UpdatePartialModelMixin',
 ]
@@ -31,42 +100,157 @@ class BaseMixin:
     input_schema = None
     output_schema = None
     wrapper_schema = None
+    trusted_serialization = False
+    serializer = None
+    output_columns = None
+    expand_fields = {}
+    query_cache = None
     params = {}
 
+    @classmethod
+    def serialize(cls, data, fields=None):
+        serializer = cls.serializer
+        if fields and serializer is not None:
+            names = parse_fields(fields)
+            if cls.trusted_serialization:
+                serializer = serializer.only(names)
+            else:
+                serializer = SchemaSerializer(SchemaFactory.partial_schema(cls._expanded_output_schema, names))
+        return serialize(data, getattr(cls, 'model', None), serializer)
+
+    @classmethod
+    def get_columns(cls, request=None):
+        if cls.output_columns is None:
+            return None
+        columns = cls.output_columns
+        if request is not None:
+            fields = parse_fields(request.query_params.get('fields'))
+            if fields:
+                columns = {name: column for name, column in columns.items() if name in fields}
+            for field_name in request.query_params.getlist('sort'):
+                column = get_model_column(cls.model, field_name.lstrip('-'))
+                if column is not None:
+                    columns = {**columns, field_name: column}
+            for name in cls.get_expand(request.query_params.get('expand')):
+                attr_name, _, _ = get_relation(cls.model, cls.expand_fields[name])
+                columns = {**columns, attr_name: get_model_column(cls.model, attr_name)}
+        columns = {column.name: column for column in columns.values()}
+        for column in cls.model.__table__.primary_key.columns:
+            columns.setdefault(column.name, column)
+        return list(columns.values())
+
+    @classmethod
+    def get_query_shape(cls, request, *parts):
+        return (
+            *parts,
+            tuple(request.query_params.getlist('sort')),
+            request.query_params.get('fields'),
+            request.query_params.get('expand'),
+        )
+
+    @classmethod
+    def is_default_method(cls, name) -> bool:
+        return getattr(cls, name).__module__ == __name__
+
+    @classmethod
+    def has_default_queries(cls) -> bool:
+        """Only queries built and run by this module are guaranteed to depend on the request shape alone"""
+        return all(cls.is_default_method(name) for name in CACHED_QUERY_METHODS if hasattr(cls, name))
+
+    @classmethod
+    def cached_query(cls, shape, build, params=None):
+        query = build()
+        if cls.query_cache is None or not cls.has_default_queries():
+            return route_query(query)
+        db = cls.model.__metadata__
+        compiled = cls.query_cache.get((cls, *shape), lambda: query, db.bind.dialect)
+        values = get_compiled_params(compiled, query, params)
+        if values is None:
+            return route_query(query)
+        return CompiledQuery(get_read_bind(db), compiled, values)
+
+    @classmethod
+    def get_expand(cls, expand=None):
+        names = parse_fields(expand)
+        unknown = names - cls.expand_fields.keys()
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f'Unknown expand fields: {", ".join(sorted(unknown))}',
+            )
+        return names
+
+    @classmethod
+    async def expand_data(cls, request, data, expand=None):
+        for name in cls.get_expand(expand):
+            attr_name, related_model, column = get_relation(cls.model, cls.expand_fields[name])
+            loader = get_loader(request, related_model, column)
+            related = await loader.load_many([getattr(obj, attr_name) for obj in data])
+            for obj, related_obj in zip(data, related):
+                setattr(obj, name, related_obj)
+        return data
+
 
 class ViewSetMeta(type):
 
     def __new__(mcs, name, bases, attrs):
         model = attrs.get('model')
-        if model is not None:
-            for base in bases:
-                base_schema = getattr(base, 'base_schema', None)
-                if base_schema:
-                    break
-            else:
-                raise NotImplementedError(f'Base schema is not implemented for class {name}')
-            attrs['input_schema'] = attrs.get(
-                'input_schema',
-            ) or SchemaFactory.input_schema(
-                model,
-                base_schema=base_schema,
-                exclude=('id', 'created_at', 'updated_at')
-            )
-            output_schema = attrs.get('output_schema') or SchemaFactory.output_schema(model, base_schema)
-            wrapper_schema = attrs.get('wrapper_schema')
-            if wrapper_schema is not None:
-                output_schema = type(
-                    f'{output_schema.__name__}',
-                    (wrapper_schema, ),
-                    {
-                        '__annotations__': {
-                            **wrapper_schema.__annotations__,
-                            wrapper_schema.__wrapper_key__: output_schema,
-                        },
-                    },
+        if model is None and not any(getattr(base, 'model', None) is not None for base in bases):
+            return super().__new__(mcs, name, bases, attrs)
+        with startup_report.measure(f'{attrs.get("__module__")}.{attrs.get("__qualname__", name)}', 'class'):
+            if model is not None:
+                mcs.add_lazy_schemas(name, bases, attrs, model)
+            elif attrs.get('output_schema') is not None:
+                model = next(base.model for base in bases if getattr(base, 'model', None) is not None)
+                mcs.add_lazy_output_schemas(mcs.get_base_schema(name, bases), attrs, model)
+            return super().__new__(mcs, name, bases, attrs)
+
+    @staticmethod
+    def get_base_schema(name, bases):
+        for base in bases:
+            base_schema = getattr(base, 'base_schema', None)
+            if base_schema:
+                return base_schema
+        raise NotImplementedError(f'Base schema is not implemented for class {name}')
+
+    @classmethod
+    def add_lazy_schemas(mcs, name, bases, attrs, model):
+        base_schema = mcs.get_base_schema(name, bases)
+        attrs['input_schema'] = attrs.get('input_schema') or LazyAttribute(
+            lambda cls: SchemaFactory.input_schema(
+                model, base_schema=base_schema, exclude=('id', 'created_at', 'updated_at'),
+            ),
+        )
+        mcs.add_lazy_output_schemas(base_schema, attrs, model)
+
+    @staticmethod
+    def add_lazy_output_schemas(base_schema, attrs, model):
+        def build_expanded_output_schema(cls):
+            output_schema = cls._model_output_schema
+            related_schemas = {
+                name: SchemaFactory.output_schema(
+                    related[0] if isinstance(related, tuple) else related, base_schema, postfix='Related',
                 )
-            attrs['output_schema'] = output_schema
-        return super().__new__(mcs, name, bases, attrs)
+                for name, related in cls.expand_fields.items()
+                if name not in output_schema.__fields__
+            }
+            if related_schemas:
+                output_schema = SchemaFactory.expanded_schema(model, output_schema, related_schemas)
+            return output_schema
+
+        def build_output_schema(cls):
+            output_schema = cls._expanded_output_schema
+            if cls.wrapper_schema is not None:
+                output_schema = SchemaFactory.wrapped_schema(output_schema, cls.wrapper_schema)
+            return output_schema
+
+        attrs['_model_output_schema'] = attrs.get('output_schema') or LazyAttribute(
+            lambda cls: SchemaFactory.output_schema(model, base_schema),
+        )
+        attrs['_expanded_output_schema'] = LazyAttribute(build_expanded_output_schema)
+        attrs['output_columns'] = LazyAttribute(lambda cls: get_schema_columns(model, cls._model_output_schema))
+        attrs['serializer'] = LazyAttribute(lambda cls: make_serializer(cls._expanded_output_schema))
+        attrs['output_schema'] = LazyAttribute(build_output_schema)
 
 
 class BaseModelMixin(BaseMixin, metaclass=ViewSetMeta):
@@ -75,46 +259,120 @@ class BaseModelMixin(BaseMixin, metaclass=ViewSetMeta):
 
 class BaseFilterMixin(BaseMixin):
     filter_schema = BaseSchema
+    filter_plan = None
+    strict_indexes = False
 
     @classmethod
-    def _handler_filter(cls, model, field_name, value):
-        field_name, _, method = field_name.partition('__')
-        field = getattr(model, field_name)
+    def _init_filter_schema(cls):
+        model = getattr(cls, 'model', None)
+        if get_static_attr(cls.__mro__, 'filter_schema') is None and model is not None:
+            set_lazy(cls, 'filter_schema', lambda cls: cls.make_filter_schema())
+        set_lazy(cls, 'filter_plan', lambda cls: cls._init_filter_plan())
+
+    @classmethod
+    def make_filter_schema(cls):
+        return SchemaFactory.filter_schema(cls.model, indexed_only=cls.strict_indexes)
 
+    @classmethod
+    def _init_filter_plan(cls):
+        model = getattr(cls, 'model', None)
+        filter_plan = {}
+        if model is None or cls.filter_schema is None:
+            return filter_plan
+        if cls._handler_filter.__func__ is not BaseFilterMixin._handler_filter.__func__:
+            return filter_plan
+        field_names = getattr(cls.filter_schema, '__dataclass_fields__', None) or cls.filter_schema.__fields__
+        for field_name in field_names:
+            make_clause = cls._compile_filter(model, field_name)
+            if make_clause is not None:
+                filter_plan[field_name] = make_clause
+        return filter_plan
+
+    @classmethod
+    def _compile_filter(cls, model, field_name):
+        key = f'filter_{field_name}'
+        attr_name, _, method = field_name.partition('__')
+        field = get_filter_field(model, attr_name)
+        if field is None:
+            return None
+
+        if method == 'has':
+            return lambda value: field.has_key(sa.bindparam(key, value, type_=sa.Text))
+        if method == 'has_any':
+            return lambda value: field.has_any(sa.bindparam(key, value, type_=ARRAY(sa.Text)))
+        if method == 'has_all':
+            return lambda value: field.has_all(sa.bindparam(key, value, type_=ARRAY(sa.Text)))
         if method:
-            return getattr(op, method)(field, value)
+            compare = getattr(op, method)
+            return lambda value: compare(field, sa.bindparam(key, value))
 
-        if isinstance(value, Iterable) and not isinstance(value, str):
-            if issubclass(field.type.python_type, (dict, list)):
-                return field.contains(value)
-            else:
-                return field.in_(value)
+        prop = get_json_property(model, attr_name)
+        if isinstance(prop, (ArrayProperty, ObjectProperty)):
+            column = getattr(model, prop.prop_name)
+            return lambda value: column.contains(sa.bindparam(key, {prop.name: value}))
+
+        try:
+            is_container = issubclass(field.type.python_type, (dict, list))
+        except NotImplementedError:
+            is_container = False
+        array_type = ARRAY(field.type)
 
-        if value is None or isinstance(value, bool):
-            return field.is_(value)
+        def make_clause(value):
+            if value is None or isinstance(value, bool):
+                return field.is_(value)
+            if isinstance(value, str) or not isinstance(value, Iterable):
+                return op.eq(field, sa.bindparam(key, value))
+            if is_container:
+                return field.contains(sa.bindparam(key, value))
+            return field == sa.any_(sa.bindparam(key, value, type_=array_type))
 
-        return op.eq(field, value)
+        return make_clause
 
     @classmethod
-    def filter_query(cls, request: Request, query, filter_schema):
+    def _handler_filter(cls, model, field_name, value):
+        make_clause = cls._compile_filter(model, field_name)
+        if make_clause is None:
+            raise AttributeError(f'{model.__name__} has no filter field {field_name!r}')
+        return make_clause(value)
+
+    @classmethod
+    def get_filters(cls, filter_schema):
         if hasattr(filter_schema, 'dict'):
-            filters = filter_schema.dict(exclude_defaults=True).items()
-        else:
-            filters = [
-                (k, v) for k, v in asdict(filter_schema).items() if v is not None
-            ]
-        return query.where(
-            sa.and_(
-                cls._handler_filter(cls.model, field_name, value)
-                for field_name, value in filters
-            ),
+            return list(filter_schema.dict(exclude_defaults=True).items())
+        values = vars(filter_schema)
+        return [
+            (k, values[k]) for k in filter_schema.__dataclass_fields__ if values.get(k) is not None
+        ]
+
+    @classmethod
+    def get_filters_shape(cls, filters):
+        return tuple(
+            (name, 'is', value) if value is None or isinstance(value, bool)
+            else (name, isinstance(value, Iterable) and not isinstance(value, str))
+            for name, value in filters
         )
 
+    @classmethod
+    def filter_query(cls, request: Request, query, filter_schema):
+        plan = cls.filter_plan or {}
+        clauses = []
+        for field_name, value in cls.get_filters(filter_schema):
+            make_clause = plan.get(field_name)
+            if make_clause is None:
+                clauses.append(cls._handler_filter(cls.model, field_name, value))
+            else:
+                clauses.append(make_clause(value))
+        if not clauses:
+            return query
+        return query.where(sa.and_(*clauses))
+
 
 class SingleObjectMixin:
     key_name = 'id'
     key_type = int
     retrieve_function = get_object_or_404
+    update_function = update_object_or_404
+    delete_function = delete_object_or_404
 
 
 class RetrieveModelMixin(SingleObjectMixin, BaseModelMixin):
@@ -122,22 +380,44 @@ class RetrieveModelMixin(SingleObjectMixin, BaseModelMixin):
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         if not is_method_overloaded(cls, 'retrieve'):
-            cls.retrieve = classmethod(
+            set_lazy(cls, 'retrieve', lambda cls: classmethod(
                 MethodFactory.make_retrieve(
                     cls.key_name,
                     cls.key_type,
                     cls.wrapper_schema and cls.wrapper_schema.__wrapper_key__,
                 ),
-            )
+            ))
+
+
+class BatchRetrieveModelMixin(SingleObjectMixin, BaseModelMixin):
+    base_batch_schema = BaseBatchSchema
+    batch_max_size = 100
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not is_method_overloaded(cls, 'retrieve_batch'):
+            set_lazy(cls, 'retrieve_batch', lambda cls: classmethod(
+                MethodFactory.make_retrieve_batch(
+                    cls.key_name,
+                    cls.key_type,
+                    cls.wrapper_schema and cls.wrapper_schema.__wrapper_key__,
+                ),
+            ))
+
+    @classmethod
+    def get_batch_schema(cls):
+        return SchemaFactory.list_schema(
+            cls.output_schema, cls.base_batch_schema, f'{get_schema_prefix(cls.output_schema)}BatchSchema',
+        )
 
 
 class AggregateObjectMixin(BaseFilterMixin):
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         if not is_method_overloaded(cls, 'retrieve_single_object_data'):
-            cls.retrieve_single_object_data = classmethod(
+            set_lazy(cls, 'retrieve_single_object_data', lambda cls: classmethod(
                 MethodFactory.make_retrieve_single_object_data(cls.filter_schema)
-            )
+            ))
 
     @classmethod
     def get_query(cls, request, f=None):
@@ -146,37 +426,117 @@ class AggregateObjectMixin(BaseFilterMixin):
 
 class BaseListModelMixin(BaseFilterMixin):
     base_list_schema = BasePaginatedListSchema
+    base_cursor_list_schema = BaseCursorPaginatedListSchema
+    cursor_pagination = False
+    count_strategy = CountStrategy.exact
+    default_limit = 100
+    max_limit = 1000
+    clamp_limit = False
     list_schema = None
     filter_schema = None
+    search_fields = ()
+    search_param = 'q'
+    search_vector = None
+    search_config = 'english'
+    search_rank = False
     model = None
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         model = getattr(cls, 'model', None)
         if model is not None:
-            if cls.list_schema is None:
-                cls.list_schema = SchemaFactory.list_schema(
+            if get_static_attr(cls.__mro__, 'list_schema') is None:
+                set_lazy(cls, 'list_schema', lambda cls: SchemaFactory.list_schema(
                     cls.output_schema,
-                    cls.base_list_schema,
-                    f'{model.__name__.title()}ListSchema',
-                )
-            if cls.filter_schema is None:
-                cls.filter_schema = SchemaFactory.filter_schema(
-                    model, f'{cls.__name__}FilterSchema'
-                )
-            if not is_method_overloaded(cls, 'retrieve_list'):
-                cls.retrieve_list = classmethod(
-                    MethodFactory.make_retrieve_list(
-                        cls.filter_schema,
+                    cls.base_cursor_list_schema if cls.cursor_pagination else cls.base_list_schema,
+                    '{}{}ListSchema'.format(
+                        get_schema_prefix(cls.output_schema), 'Cursor' if cls.cursor_pagination else '',
                     ),
-                )
+                ))
+            cls._init_filter_schema()
+            if not is_method_overloaded(cls, 'retrieve_list'):
+                set_lazy(cls, 'retrieve_list', lambda cls: classmethod(cls.make_retrieve_list()))
+
+    @classmethod
+    def make_filter_schema(cls):
+        return SchemaFactory.filter_schema(
+            cls.model, indexed_only=cls.strict_indexes, search_param=cls.search_param if cls.is_searchable() else None,
+        )
+
+    @classmethod
+    def _compile_filter(cls, model, field_name):
+        if field_name == cls.search_param and cls.is_searchable():
+            vector = cls.get_search_vector()
+            return lambda value: vector.op('@@')(cls.get_search_query(value))
+        return super()._compile_filter(model, field_name)
+
+    @classmethod
+    def is_searchable(cls) -> bool:
+        return bool(cls.search_fields or cls.search_vector)
+
+    @classmethod
+    def get_search_vector(cls):
+        if cls.search_vector is not None:
+            return getattr(cls.model, cls.search_vector)
+        return make_search_vector(cls.model, cls.search_fields, cls.search_config)
+
+    @classmethod
+    def get_search_query(cls, value: str):
+        return sa.func.websearch_to_tsquery(
+            sql_literal(cls.search_config), sa.bindparam(f'filter_{cls.search_param}', value, type_=sa.Text),
+        )
+
+    @classmethod
+    def rank_query(cls, request, query, filters):
+        value = getattr(filters, cls.search_param, None)
+        if value is None or not cls.is_searchable():
+            return query
+        rank = sa.func.ts_rank(cls.get_search_vector(), cls.get_search_query(value))
+        return query.order_by(desc(rank), *cls.model.__table__.primary_key.columns)
+
+    @classmethod
+    def make_retrieve_list(cls):
+        if cls.cursor_pagination:
+            return MethodFactory.make_retrieve_cursor_list(cls.filter_schema, cls.get_limit_query())
+        return MethodFactory.make_retrieve_list(cls.filter_schema, cls.get_limit_query())
+
+    @classmethod
+    def get_limit_query(cls):
+        default = cls.default_limit or cls.max_limit or 0
+        if cls.max_limit is None:
+            return Query(default, ge=0, description='0 returns all rows')
+        default = min(default, cls.max_limit)
+        if cls.clamp_limit:
+            return Query(default, ge=0, description=f'Values above {cls.max_limit} (or 0) are clamped to it')
+        return Query(default, ge=1, le=cls.max_limit)
+
+    @classmethod
+    def get_limit(cls, limit: int) -> int:
+        if cls.max_limit is not None and (not limit or limit > cls.max_limit):
+            return cls.max_limit
+        return limit
 
     @classmethod
     def get_query(cls, request, f=None):
+        columns = cls.get_columns(request)
+        if columns is not None:
+            return cls.model.query.with_only_columns(columns)
         return cls.model.query
 
+    @classmethod
+    def check_sort(cls, sort):
+        if not cls.strict_indexes or not sort:
+            return
+        unindexed = [field_name for field_name in sort if not is_sort_indexed(cls.model, field_name)]
+        if unindexed:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f'Sorting by fields without index is not allowed: {", ".join(unindexed)}',
+            )
+
     @classmethod
     def sort_query(cls, request, query, sort):
+        cls.check_sort(sort)
         columns = query.c
         sort_fields = []
         for field_name in sort:
@@ -188,37 +548,204 @@ class BaseListModelMixin(BaseFilterMixin):
                 sort_fields.append(desc(field) if is_desc else asc(field))
         return query.order_by(*sort_fields) if sort_fields else query
 
+    @classmethod
+    def get_cursor_fields(cls, request, query, sort):
+        cls.check_sort(sort)
+        columns = {
+            column.key: getattr(column, 'element', column) for column in query.inner_columns
+        }
+        cursor_fields = []
+        for field_name in sort or ():
+            _, is_desc, field_name = field_name.rpartition('-')
+            field = columns.get(field_name)
+            if field is None:
+                field = getattr(cls.model, field_name)
+            attr_name = cls.model._column_name_map.invert_get(field_name, field_name)
+            cursor_fields.append((attr_name, field, bool(is_desc)))
+        used_names = {attr_name for attr_name, _, _ in cursor_fields}
+        for column in cls.model.__table__.primary_key.columns:
+            attr_name = cls.model._column_name_map.invert_get(column.name, column.name)
+            if attr_name not in used_names:
+                cursor_fields.append((attr_name, columns.get(column.key, column), False))
+        return cursor_fields
+
+    @classmethod
+    def sort_query_by_cursor_fields(cls, query, cursor_fields):
+        return query.order_by(*(
+            desc(field) if is_desc else asc(field) for _, field, is_desc in cursor_fields
+        ))
+
+    @classmethod
+    def seek_query(cls, request, query, cursor_fields, values):
+        if len(values) != len(cursor_fields):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Cursor does not match sort parameters',
+            )
+        fields = [field for _, field, _ in cursor_fields]
+        values = [
+            sa.bindparam(f'cursor_{index}', value, type_=field.type)
+            for index, (field, value) in enumerate(zip(fields, values))
+        ]
+        directions = {is_desc for _, _, is_desc in cursor_fields}
+        nullable = [not isinstance(field, sa.Column) or field.nullable for field in fields]
+        if len(directions) == 1 and not any(nullable):
+            compare = op.lt if directions.pop() else op.gt
+            return query.where(compare(sa.tuple_(*fields), sa.tuple_(*values)))
+        clauses = []
+        for index, (_, field, is_desc) in enumerate(cursor_fields):
+            clauses.append(sa.and_(
+                *(
+                    f.isnot_distinct_from(v) if is_nullable else op.eq(f, v)
+                    for f, v, is_nullable in zip(fields[:index], values[:index], nullable)
+                ),
+                cls.seek_clause(field, values[index], is_desc, nullable[index]),
+            ))
+        return query.where(sa.or_(*clauses))
+
+    @classmethod
+    def seek_clause(cls, field, value, is_desc, nullable):
+        """Rows after ``value``; like Postgres' default ordering, NULL sorts after every value ascending"""
+        compare = op.lt if is_desc else op.gt
+        if not nullable:
+            return compare(field, value)
+        value_is_null = sa.cast(value, field.type).is_(None)
+        if is_desc:
+            return sa.or_(compare(field, value), sa.and_(value_is_null, field.isnot(None)))
+        return sa.or_(compare(field, value), sa.and_(sa.not_(value_is_null), field.is_(None)))
+
+    @classmethod
+    def total_query(cls, query):
+        return sa.select([sa.func.count()]).select_from(query.order_by(None).alias())
+
     @classmethod
     async def total(cls, query):
-        return await sa.select([sa.func.count()]).select_from(query.alias()).gino.scalar()
+        return await cls.total_query(query).gino.scalar()
+
+    @classmethod
+    async def estimate_total(cls, query):
+        table = cls.model.__table__
+        if query._whereclause is None and list(query.froms) == [table]:
+            reltuples = await get_read_bind(cls.model.__metadata__).scalar(
+                sa.select([sa.cast(sa.column('reltuples'), sa.BigInteger)])
+                .select_from(sa.table('pg_class'))
+                .where(sa.column('oid') == sa.func.to_regclass(table.fullname)),
+            )
+            if reltuples is not None and reltuples > 0:
+                return reltuples
+        plan = await Explain(query, 'FORMAT JSON').gino.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @classmethod
+    def window_total_query(cls, query):
+        total = sa.func.count().over().label(WINDOW_TOTAL_LABEL)
+        query = query.column(total)
+        if query.get_execution_options().get('model') is not None:
+            query = query.execution_options(loader=cls.model.load(**{WINDOW_TOTAL_LABEL: total}))
+        return query
+
+    @classmethod
+    async def window_total(cls, query, data, offset):
+        if data:
+            return getattr(data[0], WINDOW_TOTAL_LABEL)
+        if offset:
+            return await cls.total(query)
+        return 0
 
     @classmethod
     def paginate(cls, query: ClauseElement, offset: int, limit: int) -> ClauseElement:
         if limit:
-            query = query.limit(limit)
-        return query.offset(offset)
+            query = query.limit(sa.bindparam('limit', limit))
+        return query.offset(sa.bindparam('offset', offset))
 
     @classmethod
     async def prepare_data_hook(cls, query):
         return await query.gino.all()
 
     @classmethod
-    def prepare_response(cls, data, offset, limit, total):
+    def prepare_response(cls, data, offset, limit, total, count_strategy=CountStrategy.exact, requested_limit=None):
         data = {
             'data': data,
             'pagination': {
                 'offset': offset,
                 'limit': limit,
+                'requested_limit': requested_limit,
                 'total': total,
+                'count_strategy': count_strategy,
             },
         }
         return data
 
+    @classmethod
+    def prepare_cursor_response(cls, data, limit, next_cursor, requested_limit=None):
+        return {
+            'data': data,
+            'pagination': {
+                'limit': limit,
+                'requested_limit': requested_limit,
+                'next_cursor': next_cursor,
+            },
+        }
+
 
 class ListModelMixin(BaseModelMixin, BaseListModelMixin):
     pass
 
 
+class ExportMixin(BaseListModelMixin):
+    export_chunk_size = 500
+    export_media_types = {
+        ExportFormat.ndjson: 'application/x-ndjson',
+        ExportFormat.csv: 'text/csv',
+    }
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if get_static_attr(cls.__mro__, 'filter_schema') is not None and not is_method_overloaded(cls, 'export'):
+            set_lazy(cls, 'export', lambda cls: classmethod(MethodFactory.make_export(cls.filter_schema)))
+
+    @classmethod
+    async def iterate_export(cls, query):
+        async with query.bind.acquire() as conn:
+            async with conn.transaction():
+                async for obj in conn.iterate(query):
+                    yield obj
+
+    @classmethod
+    async def stream_export(cls, query, export_format, fields=None):
+        serializer = cls.serializer
+        if fields:
+            serializer = serializer.only(parse_fields(fields))
+        if export_format is ExportFormat.csv:
+            yield dumps_csv_rows([serializer.names])
+        chunk = []
+        async for obj in cls.iterate_export(query):
+            chunk.append(serializer(obj))
+            if len(chunk) >= cls.export_chunk_size:
+                yield cls.dumps_export_chunk(chunk, export_format)
+                chunk = []
+        if chunk:
+            yield cls.dumps_export_chunk(chunk, export_format)
+
+    @classmethod
+    def dumps_export_chunk(cls, chunk, export_format):
+        if export_format is ExportFormat.csv:
+            return dumps_csv_rows([row.values() for row in chunk])
+        return b''.join(dumps(row) + b'\n' for row in chunk)
+
+    @classmethod
+    def prepare_export_response(cls, query, export_format, fields=None):
+        return StreamingResponse(
+            cls.stream_export(query, export_format, fields),
+            media_type=cls.export_media_types[export_format],
+            headers={
+                'Content-Disposition': f'attachment; filename="{cls.model.__tablename__}.{export_format.value}"',
+            },
+        )
+
+
 class BaseModelUpdateMixin(BaseModelMixin):
     @classmethod
     async def _update(cls, request, id: int, schema: BaseModel):
@@ -235,34 +762,55 @@ class CreateModelMixin(BaseModelMixin):
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         if not is_method_overloaded(cls, 'create'):
-            cls.create = classmethod(
+            set_lazy(cls, 'create', lambda cls: classmethod(
                 MethodFactory.make_create(
                     cls.get_create_schema(),
                     cls.wrapper_schema and cls.wrapper_schema.__wrapper_key__,
                 )
-            )
+            ))
 
     @classmethod
     def get_create_schema(cls):
         return cls.create_schema or cls.input_schema
 
 
+class BulkCreateModelMixin(CreateModelMixin):
+    bulk_create_chunk_size = 1000
+    bulk_create_returning = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not is_method_overloaded(cls, 'bulk_create'):
+            set_lazy(cls, 'bulk_create', lambda cls: classmethod(
+                MethodFactory.make_bulk_create(
+                    cls.get_create_schema(),
+                    cls.wrapper_schema and cls.wrapper_schema.__wrapper_key__,
+                )
+            ))
+
+    @classmethod
+    def get_bulk_create_schema(cls):
+        if cls.bulk_create_returning:
+            return List[cls.output_schema]
+        return BaseBulkSchema
+
+
 class UpdateModelMixin(SingleObjectMixin, BaseModelMixin):
     put_schema = None
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
-        if cls.put_schema is None and cls.model is not None:
-            cls.put_schema = SchemaFactory.put_schema(cls.model, cls.base_schema)
+        if get_static_attr(cls.__mro__, 'put_schema') is None and cls.model is not None:
+            set_lazy(cls, 'put_schema', lambda cls: SchemaFactory.put_schema(cls.model, cls.base_schema))
         if not is_method_overloaded(cls, 'update'):
-            cls.update = classmethod(
+            set_lazy(cls, 'update', lambda cls: classmethod(
                 MethodFactory.make_update(
                     cls.get_put_schema(),
                     cls.key_name,
                     cls.key_type,
                     cls.wrapper_schema and cls.wrapper_schema.__wrapper_key__,
                 )
-            )
+            ))
 
     @classmethod
     def get_put_schema(cls):
@@ -274,49 +822,347 @@ class UpdatePartialModelMixin(SingleObjectMixin, BaseModelUpdateMixin):
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
-        if cls.patch_schema is None and cls.model is not None:
-            cls.patch_schema = SchemaFactory.patch_schema(cls.model, cls.base_schema)
+        if get_static_attr(cls.__mro__, 'patch_schema') is None and cls.model is not None:
+            set_lazy(cls, 'patch_schema', lambda cls: SchemaFactory.patch_schema(cls.model, cls.base_schema))
         if not is_method_overloaded(cls, 'update_partial'):
-            cls.update_partial = classmethod(
+            set_lazy(cls, 'update_partial', lambda cls: classmethod(
                 MethodFactory.make_update_partial(
                     cls.get_patch_schema(),
                     cls.key_name,
                     cls.key_type,
                     cls.wrapper_schema and cls.wrapper_schema.__wrapper_key__,
                 )
-            )
+            ))
 
     @classmethod
     def get_patch_schema(cls):
         return cls.patch_schema
 
 
+class BulkUpdatePartialModelMixin(BaseFilterMixin, UpdatePartialModelMixin):
+    filter_schema = None
+    update_partial_list_schema = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._init_filter_schema()
+        if get_static_attr(cls.__mro__, 'filter_schema') is not None and not is_method_overloaded(
+            cls, 'update_partial_list',
+        ):
+            set_lazy(cls, 'update_partial_list', lambda cls: classmethod(
+                MethodFactory.make_update_partial_list(
+                    cls.get_patch_schema(),
+                    cls.filter_schema,
+                    cls.wrapper_schema and cls.wrapper_schema.__wrapper_key__,
+                )
+            ))
+
+    @classmethod
+    def get_update_partial_list_schema(cls):
+        update_partial_list_schema = cls.update_partial_list_schema or BaseBulkSchema
+        if cls.wrapper_schema is not None:
+            update_partial_list_schema = SchemaFactory.wrapped_schema(
+                update_partial_list_schema, cls.wrapper_schema, f'W{update_partial_list_schema.__name__}',
+            )
+        return update_partial_list_schema
+
+
 class DeleteModelMixin(SingleObjectMixin, BaseMixin):
     delete_schema = None
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         if not is_method_overloaded(cls, 'delete'):
-            cls.delete = classmethod(
+            set_lazy(cls, 'delete', lambda cls: classmethod(
                 MethodFactory.make_delete(
                     cls.key_name,
                     cls.key_type,
                     cls.wrapper_schema and cls.wrapper_schema.__wrapper_key__,
                 ),
-            )
+            ))
 
     @classmethod
     def get_delete_schema(cls):
         delete_schema = cls.delete_schema or BaseDeleteSchema
         if cls.wrapper_schema is not None:
-            delete_schema = type(
-                f'W{delete_schema.__name__}',
-                (cls.wrapper_schema,),
-                {
-                    '__annotations__': {
-                        **cls.wrapper_schema.__annotations__,
-                        cls.wrapper_schema.__wrapper_key__: delete_schema,
-                    },
-                },
+            delete_schema = SchemaFactory.wrapped_schema(
+                delete_schema, cls.wrapper_schema, f'W{delete_schema.__name__}',
             )
         return delete_schema
+
+
+class BulkDeleteModelMixin(SingleObjectMixin, BaseFilterMixin, BaseModelMixin):
+    filter_schema = None
+    delete_list_schema = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._init_filter_schema()
+        if get_static_attr(cls.__mro__, 'filter_schema') is not None and not is_method_overloaded(cls, 'delete_list'):
+            set_lazy(cls, 'delete_list', lambda cls: classmethod(
+                MethodFactory.make_delete_list(
+                    cls.filter_schema,
+                    cls.wrapper_schema and cls.wrapper_schema.__wrapper_key__,
+                ),
+            ))
+
+    @classmethod
+    def get_delete_list_schema(cls):
+        delete_list_schema = cls.delete_list_schema or BaseBulkSchema
+        if cls.wrapper_schema is not None:
+            delete_list_schema = SchemaFactory.wrapped_schema(
+                delete_list_schema, cls.wrapper_schema, f'W{delete_list_schema.__name__}',
+            )
+        return delete_list_schema
+
+
+class CacheMixin(BaseMixin):
+    cache_backend = default_cache_backend
+    cache_ttl = 60
+    cache_namespace = None
+    cached_methods = ('retrieve', 'retrieve_batch', 'retrieve_list')
+    cache_vary_headers = ('authorization', 'cookie')
+    invalidating_methods = (
+        'create',
+        'bulk_create',
+        'update',
+        'update_partial',
+        'update_partial_list',
+        'delete',
+        'delete_list',
+    )
+
+    @classmethod
+    def get_cache_namespace(cls):
+        return cls.cache_namespace or f'viewsets:{cls.model.__tablename__}'
+
+    @classmethod
+    def get_cache_key(cls, request: Request, version) -> str:
+        query = urlencode(sorted(request.query_params.multi_items()))
+        key = f'{cls.get_cache_namespace()}:{version or 0}:{request.url.path}?{query}'
+        vary = '\n'.join(request.headers.get(name, '') for name in cls.cache_vary_headers)
+        if vary.strip():
+            key = f'{key}:{hashlib.md5(vary.encode()).hexdigest()}'
+        return key
+
+    @classmethod
+    async def invalidate_cache(cls):
+        await cls.cache_backend.incr(cls.get_cache_namespace())
+
+    @classmethod
+    def dump_cache_entry(cls, request: Request, body: bytes) -> bytes:
+        """Prefixes the body with the validator set by ``ETagMixin.check_validator`` so cache hits reuse it"""
+        validator = [getattr(request.state, 'etag', None), getattr(request.state, 'last_modified', None)]
+        return dumps(validator) + b'\n' + body
+
+    @classmethod
+    def load_cache_entry(cls, request: Request, entry: bytes) -> bytes:
+        validator, body = entry.split(b'\n', 1)
+        etag, last_modified = json.loads(validator)
+        if etag is not None:
+            request.state.etag = etag
+            request.state.last_modified = last_modified and datetime.fromisoformat(last_modified)
+        return body
+
+    @classmethod
+    def cache_endpoint(cls, name, endpoint, render=None):
+        render = render or ResponseRenderer(cls)
+        if name in cls.cached_methods:
+            @wraps(endpoint)
+            async def cached(*args, **kwargs):
+                request = kwargs.get('request')
+                if not isinstance(request, Request):
+                    return await endpoint(*args, **kwargs)
+                version = await cls.cache_backend.get(cls.get_cache_namespace())
+                key = cls.get_cache_key(request, version)
+                entry = await cls.cache_backend.get(key)
+                if entry is not None:
+                    return Response(cls.load_cache_entry(request, entry), media_type=SerializedResponse.media_type)
+                response = await render(await endpoint(*args, **kwargs))
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                await cls.cache_backend.set(key, cls.dump_cache_entry(request, response.body), cls.cache_ttl)
+                return response
+            return cached
+
+        if name in cls.invalidating_methods:
+            @wraps(endpoint)
+            async def invalidating(*args, **kwargs):
+                response = await endpoint(*args, **kwargs)
+                await cls.invalidate_cache()
+                return response
+            return invalidating
+
+        return endpoint
+
+
+class ReadReplicaMixin(BaseMixin):
+    replica_router = None
+    read_methods = (
+        'retrieve',
+        'retrieve_batch',
+        'retrieve_list',
+        'retrieve_single_object_data',
+        'export',
+    )
+    write_methods = (
+        'create',
+        'bulk_create',
+        'update',
+        'update_partial',
+        'update_partial_list',
+        'delete',
+        'delete_list',
+    )
+
+    @classmethod
+    def get_client_key(cls, request: Request):
+        return request.headers.get('authorization') or (request.client and request.client.host)
+
+    @classmethod
+    def replica_endpoint(cls, name, endpoint):
+        router = cls.replica_router
+        if router is None or name not in cls.read_methods and name not in cls.write_methods:
+            return endpoint
+        request_name, signature, added = add_hidden_param(inspect.signature(endpoint), '_replica_request', Request)
+
+        @wraps(endpoint)
+        async def routed(*args, **kwargs):
+            request = kwargs.pop(request_name) if added else kwargs[request_name]
+            client_key = cls.get_client_key(request)
+            if name in cls.write_methods:
+                router.record_write(client_key)
+                return await endpoint(*args, **kwargs)
+            index = router.acquire(client_key)
+            if index is None:
+                return await endpoint(*args, **kwargs)
+            token = current_bind.set(router.replicas[index])
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                current_bind.reset(token)
+                router.release(index)
+
+        routed.__signature__ = signature
+        return routed
+
+
+class InstrumentationMixin(BaseMixin):
+    instrumentation_hooks = (default_prometheus_hook,)
+    server_timing = False
+
+    @classmethod
+    def instrument_endpoint(cls, name, endpoint, render=None):
+        response_name, signature, added = add_hidden_param(inspect.signature(endpoint), '_timing_response', Response)
+        render = render or ResponseRenderer(cls)
+
+        @wraps(endpoint)
+        async def instrumented(*args, **kwargs):
+            sub_response = kwargs.pop(response_name) if added else kwargs[response_name]
+            trace = Trace(cls.__name__, name)
+            token = current_trace.set(trace)
+            try:
+                response = await render(await endpoint(*args, **kwargs))
+            finally:
+                current_trace.reset(token)
+                trace.finish()
+            trace.bytes += len(getattr(response, 'body', b''))
+            response.headers.raw.extend(sub_response.headers.raw)
+            if cls.server_timing:
+                response.headers['Server-Timing'] = trace.server_timing
+            for hook in cls.instrumentation_hooks:
+                hook.record(trace)
+            return response
+
+        instrumented.__signature__ = signature
+        return instrumented
+
+
+class SlowQueryLogMixin(BaseMixin):
+    slow_query_log = default_slow_query_log
+
+    @classmethod
+    def get_query_context(cls, name, request: Request, kwargs):
+        filters = kwargs.get('filters')
+        if filters is not None and hasattr(cls, 'get_filters'):
+            filters = dict(cls.get_filters(filters))
+        return QueryContext(
+            cls.slow_query_log,
+            cls.__name__,
+            name,
+            f'{request.method} {request.url.path}',
+            filters,
+            list(kwargs.get('sort') or ()),
+        )
+
+    @classmethod
+    def slow_query_endpoint(cls, name, endpoint):
+        request_name, signature, added = add_hidden_param(inspect.signature(endpoint), '_slow_query_request', Request)
+
+        @wraps(endpoint)
+        async def logged(*args, **kwargs):
+            request = kwargs.pop(request_name) if added else kwargs[request_name]
+            token = current_query_context.set(cls.get_query_context(name, request, kwargs))
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                current_query_context.reset(token)
+
+        logged.__signature__ = signature
+        return logged
+
+
+class ETagMixin(BaseMixin):
+    etag_column = None
+    etag_methods = ('retrieve', 'retrieve_list')
+
+    @classmethod
+    def _get_validator_headers(cls, etag, last_modified=None):
+        headers = {'ETag': etag}
+        if last_modified is not None:
+            headers['Last-Modified'] = http_date(last_modified)
+        return headers
+
+    @classmethod
+    async def check_validator(cls, request, query):
+        column = getattr(cls.model, cls.etag_column)
+        last_value, count = await (
+            query.with_only_columns([sa.func.max(column), sa.func.count()])
+            .order_by(None)
+            .gino.return_model(False)
+            .first()
+        )
+        if not count:
+            return None
+        request.state.etag = etag = make_etag(f'{last_value}:{count}')
+        request.state.last_modified = last_modified = last_value if isinstance(last_value, datetime) else None
+        if is_not_modified(request, etag, last_modified):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers=cls._get_validator_headers(etag, last_modified),
+            )
+        return None
+
+    @classmethod
+    def etag_endpoint(cls, name, endpoint, render=None):
+        if name not in cls.etag_methods:
+            return endpoint
+        render = render or ResponseRenderer(cls)
+
+        @wraps(endpoint)
+        async def conditional(*args, **kwargs):
+            request = kwargs.get('request')
+            response = await endpoint(*args, **kwargs)
+            if not isinstance(request, Request):
+                return response
+            response = await render(response)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = response.body
+            etag = getattr(request.state, 'etag', None) or make_etag(body)
+            last_modified = getattr(request.state, 'last_modified', None)
+            headers = cls._get_validator_headers(etag, last_modified)
+            if is_not_modified(request, etag, last_modified):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            return Response(body, media_type=SerializedResponse.media_type, headers=headers)
+        return conditional
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+
+from sqlalchemy.sql import visitors
+from sqlalchemy.sql.elements import BindParameter
+
+__all__ = ['CompiledQuery', 'CompiledQueryCache', 'default_query_cache', 'get_compiled_params']
+
+
+def get_bindparams(statement) -> list:
+    return [element for element in visitors.iterate(statement, {}) if isinstance(element, BindParameter)]
+
+
+def get_compiled_params(compiled, statement, params=None):
+    """
+    Bind values of ``statement`` under the names used by ``compiled`` (a compiled statement of the same shape),
+    ``None`` when their bind parameters don't line up. Limit and offset are not reachable by traversal
+    and have to be passed in ``params``
+    """
+    cached_binds = get_bindparams(compiled.statement)
+    binds = get_bindparams(statement)
+    if len(cached_binds) != len(binds):
+        return None
+    values = dict(params or {})
+    for cached_bind, bind in zip(cached_binds, binds):
+        if cached_bind._orig_key != bind._orig_key:
+            return None
+        values[compiled.bind_names[cached_bind]] = bind.effective_value
+    return values
+
+
+class CompiledQuery:
+    __slots__ = ('bind', 'compiled', 'params')
+
+    def __init__(self, bind, compiled, params):
+        self.bind = bind
+        self.compiled = compiled
+        self.params = params
+
+    @property
+    def gino(self):
+        return self
+
+    async def all(self):
+        return await self.bind.all(self.compiled, **self.params)
+
+    async def first(self):
+        return await self.bind.first(self.compiled, **self.params)
+
+    async def one_or_none(self):
+        return await self.bind.one_or_none(self.compiled, **self.params)
+
+    async def scalar(self):
+        return await self.bind.scalar(self.compiled, **self.params)
+
+
+class CompiledQueryCache:
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, build, dialect):
+        compiled = self._data.get(key)
+        if compiled is not None:
+            self.hits += 1
+            self._data.move_to_end(key)
+            return compiled
+        self.misses += 1
+        compiled = self._data[key] = build().compile(dialect=dialect)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
+
+    def __len__(self):
+        return len(self._data)
+
+
+default_query_cache = CompiledQueryCache()
@@ -1,5 +1,10 @@
 from fastapi import APIRouter
 
+from .indexes import IndexAdvisor
+from .instrumentation import default_prometheus_hook
+from .lazy import startup_report
+from .serialization import ResponseRenderer, serialize_response
+from .slow_queries import default_slow_query_log
 from .utils import camel_to_snake_case
 
 __all__ = ['MainRouter']
@@ -7,12 +12,48 @@ __all__ = ['MainRouter']
 
 class MainRouter(APIRouter):
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.views = []
+
+    @classmethod
+    def _get_endpoint(cls, view, name, response_model=None, status_code=None, **route_kwargs):
+        render = ResponseRenderer(view, response_model, status_code)
+        endpoint = serialize_response(view, getattr(view, name), render)
+        if hasattr(view, 'cache_endpoint'):
+            endpoint = view.cache_endpoint(name, endpoint, render)
+        if hasattr(view, 'etag_endpoint'):
+            endpoint = view.etag_endpoint(name, endpoint, render)
+        if hasattr(view, 'replica_endpoint'):
+            endpoint = view.replica_endpoint(name, endpoint)
+        if hasattr(view, 'slow_query_endpoint'):
+            endpoint = view.slow_query_endpoint(name, endpoint)
+        if hasattr(view, 'instrument_endpoint'):
+            endpoint = view.instrument_endpoint(name, endpoint, render)
+        return endpoint
+
     @classmethod
     def _build_single_obj_path(cls, base_path, name='id', annotation=str):
         return f'{base_path}/{{{name}:{annotation.__name__}}}'
 
+    def add_metrics_route(self, path: str = '/metrics', hook=default_prometheus_hook, **kwargs):
+        self.add_api_route(path, hook.endpoint, include_in_schema=False, **kwargs)
+
+    def add_slow_query_route(self, path: str = '/debug/slow-queries', log=default_slow_query_log, **kwargs):
+        self.add_api_route(path, log.endpoint, include_in_schema=False, **kwargs)
+
+    async def advise_indexes(self, bind=None, advisor: IndexAdvisor = None) -> IndexAdvisor:
+        """Checks filter and sort paths of added views against ``pg_indexes``, e.g. in a startup handler"""
+        advisor = advisor or IndexAdvisor()
+        await advisor.check(self.views, bind)
+        return advisor
+
     def add_view(self, base_path: str = '', tags: list = None, **kwargs):
         def wrapper(view):
+            with startup_report.measure(view, 'add_view'):
+                return register(view)
+
+        def register(view):
             nonlocal base_path, tags
             if not base_path:
                 tag = camel_to_snake_case(view.model.__name__)
@@ -27,40 +68,73 @@ class MainRouter(APIRouter):
             if hasattr(view, 'retrieve_list'):
                 params = view.params.get('retrieve_list') or {}
                 method = self.get(path=base_path, response_model=view.list_schema, tags=tags, **kwargs, **params)
-                method(view.retrieve_list)
+                method(self._get_endpoint(view, 'retrieve_list', view.list_schema, **kwargs, **params))
+
+            if hasattr(view, 'export'):
+                params = view.params.get('export') or {}
+                method = self.get(path=f'{base_path}/export', tags=tags, **kwargs, **params)
+                method(self._get_endpoint(view, 'export', **kwargs, **params))
+
+            if hasattr(view, 'retrieve_batch'):
+                params = view.params.get('retrieve_batch') or {}
+                batch_schema = view.get_batch_schema()
+                method = self.get(path=f'{base_path}/batch', response_model=batch_schema, tags=tags, **kwargs, **params)
+                method(self._get_endpoint(view, 'retrieve_batch', batch_schema, **kwargs, **params))
 
             if hasattr(view, 'retrieve'):
                 params = view.params.get('retrieve') or {}
                 method = self.get(path=path, response_model=view.output_schema, tags=tags, **kwargs, **params)
-                method(view.retrieve)
+                method(self._get_endpoint(view, 'retrieve', view.output_schema, **kwargs, **params))
 
             if hasattr(view, 'retrieve_single_object_data'):
                 params = view.params.get('retrieve_single_object_data') or {}
                 method = self.get(path=base_path, response_model=view.output_schema, tags=tags, **kwargs, **params)
-                method(view.retrieve_single_object_data)
+                method(self._get_endpoint(view, 'retrieve_single_object_data', view.output_schema, **kwargs, **params))
 
             if hasattr(view, 'create'):
                 params = view.params.get('create') or {}
                 method = self.post(path=base_path, response_model=view.output_schema, tags=tags, **kwargs, **params)
-                method(view.create)
+                method(self._get_endpoint(view, 'create', view.output_schema, **kwargs, **params))
+
+            if hasattr(view, 'bulk_create'):
+                params = view.params.get('bulk_create') or {}
+                response_model = view.get_bulk_create_schema()
+                method = self.post(
+                    path=f'{base_path}/bulk', response_model=response_model, tags=tags, **kwargs, **params,
+                )
+                method(self._get_endpoint(view, 'bulk_create', response_model, **kwargs, **params))
 
             if hasattr(view, 'update'):
                 params = view.params.get('update') or {}
                 view.update.__annotations__['request'] = view.get_put_schema()
                 method = self.put(path=path, response_model=view.output_schema, tags=tags, **kwargs, **params)
-                method(view.update)
+                method(self._get_endpoint(view, 'update', view.output_schema, **kwargs, **params))
 
             if hasattr(view, 'update_partial'):
                 params = view.params.get('update_partial') or {}
                 view.update_partial.__annotations__['request'] = view.get_patch_schema()
                 method = self.patch(path=path, response_model=view.output_schema, tags=tags, **kwargs, **params)
-                method(view.update_partial)
+                method(self._get_endpoint(view, 'update_partial', view.output_schema, **kwargs, **params))
+
+            if hasattr(view, 'update_partial_list'):
+                params = view.params.get('update_partial_list') or {}
+                response_model = view.get_update_partial_list_schema()
+                method = self.patch(path=base_path, response_model=response_model, tags=tags, **kwargs, **params)
+                method(self._get_endpoint(view, 'update_partial_list', response_model, **kwargs, **params))
 
             if hasattr(view, 'delete'):
                 params = view.params.get('delete') or {}
-                method = self.delete(path=path, response_model=view.get_delete_schema(), tags=tags, **kwargs, **params)
-                method(view.delete)
+                response_model = view.get_delete_schema()
+                method = self.delete(path=path, response_model=response_model, tags=tags, **kwargs, **params)
+                method(self._get_endpoint(view, 'delete', response_model, **kwargs, **params))
+
+            if hasattr(view, 'delete_list'):
+                params = view.params.get('delete_list') or {}
+                response_model = view.get_delete_list_schema()
+                method = self.delete(path=base_path, response_model=response_model, tags=tags, **kwargs, **params)
+                method(self._get_endpoint(view, 'delete_list', response_model, **kwargs, **params))
 
+            self.views.append(view)
             return view
 
         return wrapper
@@ -0,0 +1,79 @@
+import enum
+import itertools
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from sqlalchemy.sql.selectable import Select
+
+__all__ = ['ReplicaRouter', 'ReplicaStrategy', 'current_bind', 'get_read_bind', 'route_query']
+
+current_bind = ContextVar('current_bind', default=None)
+
+
+class ReplicaStrategy(str, enum.Enum):
+    round_robin = 'round_robin'
+    least_busy = 'least_busy'
+
+
+def get_read_bind(default=None):
+    return current_bind.get() or default
+
+
+def route_query(query):
+    bind = current_bind.get()
+    if bind is None or not isinstance(query, Select):
+        return query
+    query = query.execution_options()
+    query.bind = bind
+    return query
+
+
+class ReplicaRouter:
+
+    def __init__(
+        self,
+        replicas,
+        strategy: ReplicaStrategy = ReplicaStrategy.round_robin,
+        read_your_writes: float = 5.0,
+        maxsize: int = 10000,
+        timer=time.monotonic,
+    ):
+        self.replicas = list(replicas)
+        self.strategy = ReplicaStrategy(strategy)
+        self.read_your_writes = read_your_writes
+        self.maxsize = maxsize
+        self.timer = timer
+        self.in_flight = [0] * len(self.replicas)
+        self._indexes = itertools.cycle(range(len(self.replicas)))
+        self._writes = OrderedDict()
+
+    def record_write(self, client_key):
+        if client_key is None or not self.read_your_writes:
+            return
+        self._writes[client_key] = self.timer() + self.read_your_writes
+        self._writes.move_to_end(client_key)
+        while len(self._writes) > self.maxsize:
+            self._writes.popitem(last=False)
+
+    def is_pinned(self, client_key) -> bool:
+        expires_at = self._writes.get(client_key)
+        if expires_at is None:
+            return False
+        if expires_at <= self.timer():
+            del self._writes[client_key]
+            return False
+        return True
+
+    def acquire(self, client_key=None):
+        if not self.replicas or self.is_pinned(client_key):
+            return None
+        if self.strategy is ReplicaStrategy.least_busy:
+            index = min(range(len(self.replicas)), key=self.in_flight.__getitem__)
+        else:
+            index = next(self._indexes)
+        self.in_flight[index] += 1
+        return index
+
+    def release(self, index):
+        self.in_flight[index] -= 1
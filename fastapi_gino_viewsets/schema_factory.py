@@ -1,10 +1,16 @@
-from collections import defaultdict
-from typing import List
+from dataclasses import MISSING
+from datetime import datetime
+from typing import List, Optional
 
+from fastapi import Query
+from gino.json_support import ArrayProperty, DateTimeProperty, JSONProperty, ObjectProperty
 from ginodantic.gino_model_meta import GinoModelMeta
+from ginodantic.utils import make_pydantic_dataclass
 from pydantic.main import ModelMetaclass
+from sqlalchemy.dialects.postgresql import JSONB
 
-from .utils import create_meta_class
+from .indexes import is_filter_indexed
+from .utils import create_meta_class, get_schema_prefix
 
 __all__ = ['SchemaFactory']
 FIELD_METHODS_BY_TYPE = {
@@ -13,45 +19,81 @@ FIELD_METHODS_BY_TYPE = {
 }
 
 
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
 class SchemaFactory:
-    used_schema_names = defaultdict(int)
     config = type('Config', (), {'orm_mode': True})
+    schemas = {}
+
+    @classmethod
+    def _get_or_create(cls, key, create):
+        try:
+            schema = cls.schemas.get(key)
+        except TypeError:
+            return create()
+        if schema is None:
+            schema = cls.schemas[key] = create()
+        return schema
 
     @classmethod
-    def _register_schema_name(cls, schema_name):
-        used_before = cls.used_schema_names.get(schema_name)
-        if used_before is not None:
-            schema_name = f'{schema_name}{used_before}'
-        cls.used_schema_names[schema_name] += 1
-        return schema_name
+    def clear_cache(cls):
+        cls.schemas.clear()
 
     @classmethod
     def input_schema(cls, model, base_schema, schema_name=None, **meta_kwargs):
         schema_name = schema_name or f'{model.__name__.title()}InputSchema'
         meta = create_meta_class(model, **meta_kwargs)
-        return GinoModelMeta(schema_name, (base_schema,), {'Meta': meta})
+        return cls._get_or_create(
+            ('input', model, base_schema, schema_name, _freeze(meta_kwargs)),
+            lambda: GinoModelMeta(schema_name, (base_schema,), {'Meta': meta}),
+        )
 
     @classmethod
     def output_schema(cls, model, base_schema, schema_name=None, postfix='', **meta_kwargs):
         schema_name = schema_name or f'{model.__name__.title()}{postfix}OutputSchema'
         meta = create_meta_class(model, **meta_kwargs)
         config = type('Config', (), {'orm_mode': True})
-        return GinoModelMeta(schema_name, (base_schema,), {'Meta': meta, 'Config': config})
+        return cls._get_or_create(
+            ('output', model, base_schema, schema_name, _freeze(meta_kwargs)),
+            lambda: GinoModelMeta(schema_name, (base_schema,), {'Meta': meta, 'Config': config}),
+        )
 
     @classmethod
     def put_schema(cls, model, base_schema, schema_name=None):
         schema_name = schema_name or f'{model.__name__.title()}PutSchema'
         meta = create_meta_class(model=model, exclude=('id',))
-        return GinoModelMeta(schema_name, (base_schema,), {'Meta': meta,},)
+        return cls._get_or_create(
+            ('put', model, base_schema, schema_name),
+            lambda: GinoModelMeta(schema_name, (base_schema,), {'Meta': meta,},),
+        )
 
     @classmethod
     def patch_schema(cls, model, base_schema, schema_name=None):
         schema_name = schema_name or f'{model.__name__.title()}PatchSchema'
         meta = create_meta_class(model=model, required=(), exclude=('id',))
-        return GinoModelMeta(schema_name, (base_schema,), {'Meta': meta,},)
+        return cls._get_or_create(
+            ('patch', model, base_schema, schema_name),
+            lambda: GinoModelMeta(schema_name, (base_schema,), {'Meta': meta,},),
+        )
 
     @classmethod
-    def filter_schema(cls, model, schema_name: str):
+    def filter_schema(cls, model, schema_name: str = None, indexed_only: bool = False, search_param: str = None):
+        """
+        With ``indexed_only`` only fields backed by indexes declared on the model are kept,
+        ``search_param`` adds an optional full-text search field
+        """
+        schema_name = schema_name or '{}{}{}FilterSchema'.format(
+            model.__name__.title(), 'Indexed' if indexed_only else '', 'Search' if search_param else '',
+        )
+        include = (lambda field_name: is_filter_indexed(model, field_name)) if indexed_only else None
         meta = create_meta_class(
             model=model,
             as_dataclass=True,
@@ -59,12 +101,116 @@ class SchemaFactory:
             field_methods=True,
             required=()
         )
-        return GinoModelMeta(schema_name, (), {'Meta': meta})
+        return cls._get_or_create(
+            ('filter', model, schema_name, indexed_only, search_param),
+            lambda: cls._extend_dataclass(
+                cls._extend_dataclass(
+                    GinoModelMeta(schema_name, (), {'Meta': meta}), cls.jsonb_filter_fields(model), include,
+                ),
+                [(search_param, Optional[str], None)] if search_param else [],
+            ),
+        )
+
+    @classmethod
+    def jsonb_filter_fields(cls, model):
+        """Key/element (``?``, ``?|``, ``?&``) filters for JSONB columns and properties,
+        ranges for datetime properties"""
+        fields = []
+        hosts = set()
+        for name, prop in model.__dict__.items():
+            if isinstance(prop, (ArrayProperty, ObjectProperty)):
+                fields += cls._jsonb_key_fields(name)
+            elif isinstance(prop, DateTimeProperty):
+                fields += [(f'{name}__le', datetime, None), (f'{name}__ge', datetime, None)]
+            if isinstance(prop, JSONProperty):
+                hosts.add(prop.prop_name)
+        for name, column_name in model._column_name_map.items():
+            if name not in hosts and isinstance(model.__table__.c[column_name].type, JSONB):
+                fields += cls._jsonb_key_fields(name)
+        return fields
+
+    @staticmethod
+    def _jsonb_key_fields(name):
+        return [
+            (f'{name}__has', str, None),
+            (f'{name}__has_any', List[str], Query(None)),
+            (f'{name}__has_all', List[str], Query(None)),
+        ]
+
+    @staticmethod
+    def _extend_dataclass(schema, extra_fields, include=None):
+        if not extra_fields and include is None:
+            return schema
+        fields = [
+            (field.name, field.type) if field.default is MISSING else (field.name, field.type, field.default)
+            for field in schema.__dataclass_fields__.values()
+        ]
+        names = {field[0] for field in fields}
+        fields += [field for field in extra_fields if field[0] not in names]
+        if include is not None:
+            fields = [field for field in fields if include(field[0])]
+        fields.sort(key=len)
+        return make_pydantic_dataclass(schema.__name__, fields=fields)
 
     @classmethod
     def list_schema(cls, base_schema, base_list_schema, schema_name=None):
-        return ModelMetaclass(
-            schema_name,
-            (base_list_schema,),
-            {'__annotations__': {'data': List[base_schema]}},
+        return cls._get_or_create(
+            ('list', base_schema, base_list_schema, schema_name),
+            lambda: ModelMetaclass(
+                schema_name,
+                (base_list_schema,),
+                {'__annotations__': {'data': List[base_schema]}},
+            ),
+        )
+
+    @classmethod
+    def expanded_schema(cls, model, schema, related_schemas: dict, schema_name=None):
+        schema_name = schema_name or '{}Expanded{}OutputSchema'.format(
+            model.__name__.title(), ''.join(name.title().replace('_', '') for name in sorted(related_schemas)),
+        )
+        return cls._get_or_create(
+            ('expanded', model, schema, _freeze(related_schemas), schema_name),
+            lambda: type(schema)(
+                schema_name,
+                (schema,),
+                {
+                    '__annotations__': {name: Optional[related] for name, related in related_schemas.items()},
+                    **{name: None for name in related_schemas},
+                },
+            ),
+        )
+
+    @classmethod
+    def partial_schema(cls, schema, fields, schema_name=None):
+        """Subclass of ``schema`` keeping only the fields with an alias in ``fields``, validators included"""
+        fields = frozenset(field.alias for field in schema.__fields__.values() if field.alias in fields)
+        schema_name = schema_name or f'{get_schema_prefix(schema)}PartialSchema'
+        return cls._get_or_create(
+            ('partial', schema, fields, schema_name),
+            lambda: cls._make_partial_schema(schema, fields, schema_name),
+        )
+
+    @staticmethod
+    def _make_partial_schema(schema, fields, schema_name):
+        partial_schema = type(schema_name, (schema,), {'__module__': schema.__module__})
+        for name, field in list(partial_schema.__fields__.items()):
+            if field.alias not in fields:
+                del partial_schema.__fields__[name]
+        return partial_schema
+
+    @classmethod
+    def wrapped_schema(cls, schema, wrapper_schema, schema_name=None):
+        schema_name = schema_name or f'{get_schema_prefix(schema)}{wrapper_schema.__name__}'
+        return cls._get_or_create(
+            ('wrapped', schema, wrapper_schema, schema_name),
+            lambda: type(
+                schema_name,
+                (wrapper_schema,),
+                {
+                    '__annotations__': {
+                        **wrapper_schema.__annotations__,
+                        wrapper_schema.__wrapper_key__: schema,
+                    },
+                },
+            ),
         )
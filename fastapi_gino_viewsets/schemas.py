@@ -1,16 +1,22 @@
-from typing import List, Any
+import enum
+from typing import List, Any, Optional
 
 from pydantic import BaseModel
 
 from fastapi_gino_viewsets.base_config import BaseConfig
 
 __all__ = [
+    'BaseBatchSchema',
+    'BaseBulkSchema',
+    'BaseCursorPaginatedListSchema',
     'BaseDeleteSchema',
     'BaseFilterMeta',
     'BaseListSchema',
     'BasePaginatedListSchema',
     'BaseSchema',
     'BaseWrapperSchema',
+    'CountStrategy',
+    'ExportFormat',
 ]
 
 
@@ -23,16 +29,40 @@ class BaseListSchema(BaseModel):
         arbitrary_types_allowed = True
 
 
+class CountStrategy(str, enum.Enum):
+    exact = 'exact'
+    window = 'window'
+    estimate = 'estimate'
+    none = 'none'
+
+
+class ExportFormat(str, enum.Enum):
+    ndjson = 'ndjson'
+    csv = 'csv'
+
+
 class Pagination(BaseModel):
     offset: int
     limit: int
-    total: int
+    requested_limit: Optional[int] = None
+    total: Optional[int] = None
+    count_strategy: CountStrategy = CountStrategy.exact
 
 
 class BasePaginatedListSchema(BaseListSchema):
     pagination: Pagination
 
 
+class CursorPagination(BaseModel):
+    limit: int
+    requested_limit: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class BaseCursorPaginatedListSchema(BaseListSchema):
+    pagination: CursorPagination
+
+
 class BaseSchema(BaseModel):
     class Config(BaseConfig):
         use_enum_values = True
@@ -54,3 +84,12 @@ class BaseFilterMeta:
 
 class BaseDeleteSchema(BaseModel):
     id: int
+
+
+class BaseBulkSchema(BaseModel):
+    count: int
+    keys: Optional[List[Any]] = None
+
+
+class BaseBatchSchema(BaseListSchema):
+    missing: List[Any] = []
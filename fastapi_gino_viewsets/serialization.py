@@ -0,0 +1,161 @@
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import wraps
+from uuid import UUID
+
+from fastapi import routing
+from fastapi.utils import create_response_field
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from .instrumentation import phase
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+__all__ = [
+    'ResponseRenderer',
+    'RowSerializer',
+    'SchemaSerializer',
+    'SerializedResponse',
+    'dumps',
+    'dumps_csv_rows',
+    'make_serializer',
+    'serialize',
+    'serialize_response',
+]
+
+
+def _default(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.dict(by_alias=True)
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if hasattr(value, 'items'):
+        return dict(value.items())
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default, separators=(',', ':')).encode()
+
+
+def _csv_value(value):
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, (dict, list, tuple)):
+        return dumps(value).decode()
+    return _default(value)
+
+
+def dumps_csv_rows(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+class RowSerializer:
+    __slots__ = ('fields',)
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+
+    @property
+    def names(self):
+        return [alias for alias, _, _ in self.fields]
+
+    def only(self, names):
+        return RowSerializer(field for field in self.fields if field[0] in names)
+
+    def __call__(self, obj):
+        return {alias: getattr(obj, name, default) for alias, name, default in self.fields}
+
+
+class SchemaSerializer:
+    """Validates rows with ``schema`` like ``response_model`` does"""
+    __slots__ = ('schema',)
+
+    def __init__(self, schema):
+        self.schema = schema
+
+    def __call__(self, obj):
+        return self.schema.from_orm(obj).dict(by_alias=True)
+
+
+def make_serializer(schema):
+    return RowSerializer((field.alias, field.name, field.default) for field in schema.__fields__.values())
+
+
+def serialize(data, model, serializer):
+    if isinstance(data, dict):
+        return {key: serialize(value, model, serializer) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [serialize(value, model, serializer) for value in data]
+    if model is not None and isinstance(data, model):
+        return serializer(data)
+    return data
+
+
+class SerializedResponse(Response):
+    media_type = 'application/json'
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class ResponseRenderer:
+    """Renders endpoint results the way their route would: with its ``status_code``,
+    validated by ``response_model`` unless ``trusted_serialization`` is set"""
+    __slots__ = ('view', 'response_field', 'status_code')
+
+    def __init__(self, view, response_model=None, status_code=None):
+        self.view = view
+        self.response_field = None
+        if response_model is not None:
+            self.response_field = create_response_field(
+                name=f'Response_{response_model.__name__}', type_=response_model,
+            )
+        self.status_code = status_code or 200
+
+    async def __call__(self, response, fields=None) -> Response:
+        if isinstance(response, Response):
+            return response
+        with phase('serialize'):
+            if fields or self.response_field is None or getattr(self.view, 'trusted_serialization', False):
+                content = self.view.serialize(response, fields)
+            else:
+                content = await routing.serialize_response(field=self.response_field, response_content=response)
+            return SerializedResponse(content, status_code=self.status_code)
+
+
+def serialize_response(view, endpoint, render=None):
+    render = render or ResponseRenderer(view)
+
+    @wraps(endpoint)
+    async def wrapped(*args, **kwargs):
+        response = await endpoint(*args, **kwargs)
+        if isinstance(response, Response):
+            return response
+        fields = kwargs.get('fields')
+        if fields or getattr(view, 'trusted_serialization', False):
+            return await render(response, fields)
+        return response
+
+    return wrapped
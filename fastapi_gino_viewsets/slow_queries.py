@@ -0,0 +1,126 @@
+import json
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from .serialization import SerializedResponse
+from .utils import Explain
+
+__all__ = [
+    'QueryContext',
+    'SlowQueryLog',
+    'current_query_context',
+    'default_slow_query_log',
+    'log_query',
+]
+
+current_query_context = ContextVar('current_query_context', default=None)
+
+
+class QueryContext:
+    __slots__ = ('log', 'view', 'name', 'route', 'filters', 'sort')
+
+    def __init__(self, log, view: str, name: str, route: str, filters=None, sort=None):
+        self.log = log
+        self.view = view
+        self.name = name
+        self.route = route
+        self.filters = filters
+        self.sort = list(sort or ())
+
+
+class SlowQueryLog:
+
+    def __init__(
+            self,
+            threshold: float = 0.5,
+            maxsize: int = 100,
+            explain_rate: float = 0.0,
+            timer=time.perf_counter,
+            sampler=random.random,
+    ):
+        self.threshold = threshold
+        self.explain_rate = explain_rate
+        self.timer = timer
+        self.sampler = sampler
+        self.records = deque(maxlen=maxsize)
+
+    @staticmethod
+    def compile(query):
+        if hasattr(query, 'compiled'):
+            compiled = query.compiled
+            params = compiled.construct_params(query.params)
+        else:
+            compiled = query.compile(dialect=query.bind.dialect)
+            params = compiled.params
+        if compiled.positional:
+            params = [params[name] for name in compiled.positiontup]
+        return compiled.string, params
+
+    @staticmethod
+    async def explain(query):
+        options = ('ANALYZE', 'BUFFERS', 'FORMAT JSON')
+        if hasattr(query, 'compiled'):
+            plan = await query.bind.scalar(Explain(query.compiled.statement, *options), **query.params)
+        else:
+            plan = await query.bind.scalar(Explain(query, *options))
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan
+
+    async def add(self, context: QueryContext, kind: str, query, duration: float, explain: bool = True):
+        sql, params = self.compile(query)
+        record = {
+            'view': context.view,
+            'method': context.name,
+            'route': context.route,
+            'filters': context.filters,
+            'sort': context.sort,
+            'kind': kind,
+            'sql': sql,
+            'params': params,
+            'duration': duration,
+            'timestamp': time.time(),
+            'explain': None,
+        }
+        if explain and self.explain_rate and self.sampler() < self.explain_rate:
+            try:
+                record['explain'] = await self.explain(query)
+            except Exception as exc:
+                record['explain'] = {'error': str(exc)}
+        self.records.append(record)
+        return record
+
+    def clear(self):
+        self.records.clear()
+
+    async def endpoint(self):
+        return SerializedResponse(list(reversed(self.records)))
+
+
+class log_query:
+    __slots__ = ('kind', 'query', 'context', 'started_at')
+
+    def __init__(self, kind: str, query):
+        self.kind = kind
+        self.query = query
+        self.context = None
+        self.started_at = None
+
+    async def __aenter__(self):
+        self.context = current_query_context.get()
+        if self.context is not None:
+            self.started_at = self.context.log.timer()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.context is None:
+            return
+        log = self.context.log
+        duration = log.timer() - self.started_at
+        if duration >= log.threshold:
+            await log.add(self.context, self.kind, self.query, duration, explain=exc_type is None)
+
+
+default_slow_query_log = SlowQueryLog()
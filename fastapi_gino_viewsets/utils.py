@@ -1,11 +1,51 @@
+import base64
+import enum
+import hashlib
+import inspect
+import json
 import re
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from email.utils import format_datetime, parsedate_to_datetime
 
 from fastapi import HTTPException, status
+import sqlalchemy as sa
+from gino.json_support import JSONProperty
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement
+
+CURSOR_TYPES = {
+    'datetime': (datetime, datetime.isoformat, datetime.fromisoformat),
+    'date': (date, date.isoformat, date.fromisoformat),
+    'decimal': (Decimal, str, Decimal),
+    'uuid': (uuid.UUID, str, uuid.UUID),
+}
+
+
+def get_static_attr(classes, name, default=None):
+    for klass in classes:
+        if name in vars(klass):
+            return vars(klass)[name]
+    return default
 
 
 def is_method_overloaded(cls, method_name) -> bool:
-    method = getattr(cls, method_name, False)
-    return method and method != getattr(super(cls, cls), method_name, None)
+    method = get_static_attr(cls.__mro__, method_name, False)
+    return method and method is not get_static_attr(cls.__mro__[1:], method_name)
+
+
+def add_hidden_param(signature, name, annotation):
+    for param in signature.parameters.values():
+        if param.annotation is annotation:
+            return param.name, signature, False
+    signature = signature.replace(parameters=[
+        *signature.parameters.values(),
+        inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=annotation),
+    ])
+    return name, signature, True
 
 
 def camel_to_snake_case(words: str):
@@ -16,8 +56,270 @@ def create_meta_class(model, **kwargs):
     return type("Meta", (), {"model": model, **kwargs})
 
 
-async def get_object_or_404(model, *, where):
-    obj = await model.query.where(where).gino.one_or_none()
+def parse_fields(fields: str = None) -> set:
+    return {name.strip() for name in (fields or '').split(',') if name.strip()}
+
+
+def get_model_column(model, name):
+    name = model._column_name_map.invert_get(name, name)
+    prop = model.__dict__.get(name)
+    if isinstance(prop, JSONProperty):
+        name = prop.prop_name
+    column_name = model._column_name_map.get(name)
+    if column_name is None:
+        return None
+    return model.__table__.c[column_name]
+
+
+def get_json_property(model, name):
+    prop = model.__dict__.get(name)
+    return prop if isinstance(prop, JSONProperty) else None
+
+
+def sql_literal(value: str):
+    return sa.literal_column("'{}'".format(value.replace("'", "''")), type_=sa.Text)
+
+
+def get_filter_field(model, name):
+    prop = get_json_property(model, name)
+    if prop is None:
+        return getattr(model, name, None)
+    # an inlined key (instead of a bound parameter) lets Postgres match expression indexes
+    return prop.make_expression(getattr(model, prop.prop_name)[sql_literal(prop.name)])
+
+
+def make_search_vector(model, fields, config: str):
+    """``to_tsvector(config, coalesce(a, '') || ' ' || ...)``, the expression a GIN index has to be built on"""
+    document = None
+    for name in fields:
+        field = get_filter_field(model, name)
+        if not isinstance(field.type, sa.String):
+            field = sa.cast(field, sa.Text)
+        field = sa.func.coalesce(field, sql_literal(''), type_=sa.Text)
+        document = field if document is None else document + sql_literal(' ') + field
+    return sa.func.to_tsvector(sql_literal(config), document)
+
+
+def get_schema_prefix(schema) -> str:
+    """``UserOutputSchema`` -> ``User``, used to name schemas derived from an output schema"""
+    return re.sub(r'(Output)?Schema$', '', schema.__name__) or schema.__name__
+
+
+def get_schema_columns(model, schema):
+    columns = {}
+    for field_name in schema.__fields__:
+        column = get_model_column(model, field_name)
+        if column is None:
+            return None
+        columns[field_name] = column
+    return columns
+
+
+def get_object_query(model, *, where, columns=None):
+    query = model.query
+    if columns is not None:
+        query = query.with_only_columns(columns)
+    return query.where(where)
+
+
+async def get_object_or_404(model, *, where=None, columns=None, query=None):
+    if query is None:
+        query = get_object_query(model, where=where, columns=columns)
+    obj = await query.gino.one_or_none()
+    if obj is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{model.__name__} not found")
+    return obj
+
+
+async def get_objects_by_keys(model, field, keys, columns=None, query=None):
+    if query is None:
+        query = model.query
+    if columns is not None:
+        if not any(column is field for column in columns):
+            columns = [*columns, field]
+        query = query.with_only_columns(columns)
+    keys = list(dict.fromkeys(keys))
+    objects = await query.where(field == sa.any_(sa.literal(keys, ARRAY(field.type)))).gino.all()
+    attr_name = model._column_name_map.invert_get(field.name, field.name)
+    found = {getattr(obj, attr_name): obj for obj in objects}
+    return [found[key] for key in keys if key in found], [key for key in keys if key not in found]
+
+
+def get_update_values(model, values: dict) -> dict:
+    instance = model()
+    update_values = {}
+    json_updates = {}
+    for key, value in values.items():
+        prop = model.__dict__.get(key)
+        if isinstance(prop, JSONProperty):
+            setattr(instance, key, value)
+            json_updates.setdefault(prop.prop_name, {})[prop.name] = prop.save(instance)
+        else:
+            update_values[model._column_name_map[key]] = value
+    for prop_name, updates in json_updates.items():
+        update_values[model._column_name_map[prop_name]] = getattr(model, prop_name).concat(updates)
+    return update_values
+
+
+async def update_object_or_404(model, *, where, values: dict):
+    query = model.update.values(**get_update_values(model, values)).where(where).returning(*model)
+    obj = await query.gino.first()
     if obj is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{model.__name__} not found")
     return obj
+
+
+def _dump_cursor_value(value):
+    if isinstance(value, enum.Enum):
+        return value.name
+    for tag, (type_, dump, _) in CURSOR_TYPES.items():
+        if isinstance(value, type_):
+            return {'t': tag, 'v': dump(value)}
+    return value
+
+
+def _load_cursor_value(value):
+    if isinstance(value, dict):
+        _, _, load = CURSOR_TYPES[value['t']]
+        return load(value['v'])
+    return value
+
+
+def encode_cursor(values) -> str:
+    payload = json.dumps([_dump_cursor_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(payload)
+        if not isinstance(values, list):
+            raise ValueError(cursor)
+        return [_load_cursor_value(value) for value in values]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor') from None
+
+
+class Explain(Executable, ClauseElement):
+    def __init__(self, query, *options):
+        self.query = query
+        self.options = options
+
+    @property
+    def bind(self):
+        return self.query.bind
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kwargs):
+    options = f' ({", ".join(element.options)})' if element.options else ''
+    return f'EXPLAIN{options} {compiler.process(element.query, **kwargs)}'
+
+
+async def delete_object_or_404(model, *, where, returning):
+    row = await model.delete.where(where).returning(returning).gino.return_model(False).first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{model.__name__} not found")
+    return row[0]
+
+
+def get_insert_values(model, values: dict) -> dict:
+    instance = model(**values)
+    profile_keys = set(instance.__profile__ or ())
+    for key in profile_keys:
+        model.__dict__[key].save(instance)
+    for key, prop in model.__dict__.items():
+        if key in profile_keys or not isinstance(prop, JSONProperty):
+            continue
+        if prop.default is None or prop.after_get.method is not None:
+            continue
+        setattr(instance, key, getattr(instance, key))
+        prop.save(instance)
+    return instance._get_sa_values(instance.__values__)
+
+
+def chunked(items: list, size: int):
+    size = size or len(items) or 1
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _group_by_keys(rows: list) -> dict:
+    groups = {}
+    for index, row in enumerate(rows):
+        groups.setdefault(tuple(row), []).append(index)
+    return groups
+
+
+async def insert_many(model, rows: list) -> list:
+    created = [None] * len(rows)
+    for indexes in _group_by_keys(rows).values():
+        query = model.__table__.insert().values([rows[i] for i in indexes]).returning(*model)
+        for index, obj in zip(indexes, await query.gino.load(model).all()):
+            created[index] = obj
+    return created
+
+
+async def copy_many(connection, model, rows: list):
+    table = model.__table__
+    raw_connection = await connection.get_raw_connection()
+    for keys, indexes in _group_by_keys(rows).items():
+        columns = [table.c[key] for key in keys]
+        columns += [
+            column for column in table.columns
+            if column.name not in keys and column.default is not None and not column.default.is_sequence
+        ]
+        processors = [
+            column.type.dialect_impl(connection.dialect).bind_processor(connection.dialect)
+            for column in columns
+        ]
+        records = []
+        for index in indexes:
+            record = []
+            for column, processor in zip(columns, processors):
+                if column.name in rows[index]:
+                    value = rows[index][column.name]
+                elif column.default.is_callable:
+                    value = column.default.arg(None)
+                else:
+                    value = column.default.arg
+                record.append(processor(value) if processor is not None else value)
+            records.append(tuple(record))
+        await raw_connection.copy_records_to_table(
+            table.name,
+            records=records,
+            columns=[column.name for column in columns],
+            schema_name=table.schema,
+        )
+
+
+def make_etag(value) -> str:
+    if isinstance(value, str):
+        value = value.encode()
+    return f'"{hashlib.md5(value).hexdigest()}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value), usegmt=True)
+
+
+def is_not_modified(request, etag: str, last_modified: datetime = None) -> bool:
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = {tag.strip() for tag in if_none_match.split(',')}
+        return '*' in tags or etag in tags or f'W/{etag}' in tags
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
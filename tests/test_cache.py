@@ -0,0 +1,169 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from ginodantic import BaseModelSchema
+from pydantic import validator
+from starlette.requests import Request
+
+from fastapi_gino_viewsets import MainRouter
+from fastapi_gino_viewsets.cache import BaseCacheBackend, LRUCacheBackend
+from fastapi_gino_viewsets.mixins import CacheMixin
+from fastapi_gino_viewsets.schema_factory import SchemaFactory
+from fastapi_gino_viewsets.viewsets import ReadOnlyViewSet, ViewSet
+from tests.models import User
+
+app = FastAPI()
+router = MainRouter()
+client = TestClient(app)
+
+
+class FakeRedis(BaseCacheBackend):
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ttl=None):
+        self.data[key] = value
+
+    async def incr(self, key):
+        self.data[key] = self.data.get(key, 0) + 1
+        return self.data[key]
+
+
+class FakeTimer:
+    now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@router.add_view('/cached')
+class UserCachedViewSet(CacheMixin, ViewSet):
+    model = User
+    cache_backend = FakeRedis()
+
+
+class UserUpperOutputSchema(SchemaFactory.output_schema(User, BaseModelSchema)):
+
+    @validator('nickname')
+    def upper_nickname(cls, value):
+        return value.upper()
+
+
+@router.add_view('/cached_validated')
+class UserValidatedCachedViewSet(CacheMixin, ReadOnlyViewSet):
+    model = User
+    output_schema = UserUpperOutputSchema
+    cache_backend = FakeRedis()
+
+
+app.include_router(router)
+
+
+def make_request(path, query_string=b'', headers=()):
+    return Request({
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query_string,
+        'headers': [(name.encode(), value.encode()) for name, value in headers],
+    })
+
+
+@pytest.mark.asyncio
+async def test_lru_backend_ttl():
+    timer = FakeTimer()
+    backend = LRUCacheBackend(timer=timer)
+    await backend.set('key', b'value', ttl=10)
+    assert await backend.get('key') == b'value'
+    timer.now = 10
+    assert await backend.get('key') is None
+
+
+@pytest.mark.asyncio
+async def test_lru_backend_size():
+    backend = LRUCacheBackend(maxsize=2)
+    await backend.set('a', b'1')
+    await backend.set('b', b'2')
+    assert await backend.get('a') == b'1'
+    await backend.set('c', b'3')
+    assert await backend.get('b') is None
+    assert await backend.get('a') == b'1'
+    assert len(backend) == 2
+
+
+@pytest.mark.asyncio
+async def test_lru_backend_counters_are_not_evicted():
+    backend = LRUCacheBackend(maxsize=1)
+    assert await backend.incr('version') == 1
+    await backend.set('a', b'1')
+    await backend.set('b', b'2')
+    assert await backend.get('version') == 1
+
+
+def test_cached_retrieve_and_invalidation(engine, create_users):
+    with client:
+        assert client.get('/cached/1').json()['nickname'] == 'Alex1'
+        assert client.get('/cached?sort=-age').json()['data'][0]['id'] == 5
+        response = client.patch('/cached/1', json={'nickname': 'Changed'})
+        assert response.json()['nickname'] == 'Changed'
+        assert client.get('/cached/1').json()['nickname'] == 'Changed'
+
+
+def test_cached_response_is_served_from_cache(engine, create_users):
+    loop = asyncio.get_event_loop()
+    with client:
+        assert client.get('/cached/2').json()['nickname'] == 'Alex2'
+        loop.run_until_complete(User.update.values(name='Direct').where(User.id == 2).gino.status())
+        assert client.get('/cached/2').json()['nickname'] == 'Alex2'
+        assert client.get('/cached/2?fields=nickname').json() == {'nickname': 'Direct'}
+        client.delete('/cached/3')
+        assert client.get('/cached/2').json()['nickname'] == 'Direct'
+
+
+def test_cache_key_varies_by_credentials():
+    key = UserCachedViewSet.get_cache_key(make_request('/cached/1', b'b=2&a=1'), 3)
+    assert key == 'viewsets:users:3:/cached/1?a=1&b=2'
+    assert UserCachedViewSet.get_cache_key(make_request('/cached/1', b'a=1&b=2'), 3) == key
+    keys = {
+        UserCachedViewSet.get_cache_key(make_request('/cached/1', b'a=1&b=2', headers), 3)
+        for headers in ([('authorization', 'Bearer a')], [('authorization', 'Bearer b')], [('cookie', 'session=a')])
+    }
+    assert len(keys) == 3
+    assert key not in keys
+
+
+def test_cache_entry_keeps_validator():
+    request = make_request('/cached/1')
+    request.state.etag = '"abc"'
+    request.state.last_modified = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    entry = UserCachedViewSet.dump_cache_entry(request, b'{"id":1}')
+    hit = make_request('/cached/1')
+    assert UserCachedViewSet.load_cache_entry(hit, entry) == b'{"id":1}'
+    assert (hit.state.etag, hit.state.last_modified) == (request.state.etag, request.state.last_modified)
+    entry = UserCachedViewSet.dump_cache_entry(make_request('/cached/2'), b'{"id":2}')
+    hit = make_request('/cached/2')
+    assert UserCachedViewSet.load_cache_entry(hit, entry) == b'{"id":2}'
+    assert not hasattr(hit.state, 'etag')
+
+
+def test_cached_response_is_validated(engine, create_users):
+    with client:
+        for _ in range(2):
+            assert client.get('/cached_validated/1').json()['nickname'] == 'ALEX1'
+            assert client.get('/cached_validated?sort=id').json()['data'][0]['nickname'] == 'ALEX1'
+
+
+def test_cache_varies_by_authorization(engine, create_users):
+    loop = asyncio.get_event_loop()
+    with client:
+        assert client.get('/cached/2', headers={'Authorization': 'a'}).json()['nickname'] == 'Alex2'
+        loop.run_until_complete(User.update.values(name='Direct').where(User.id == 2).gino.status())
+        assert client.get('/cached/2', headers={'Authorization': 'a'}).json()['nickname'] == 'Alex2'
+        assert client.get('/cached/2', headers={'Authorization': 'b'}).json()['nickname'] == 'Direct'
@@ -0,0 +1,101 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fastapi_gino_viewsets import MainRouter
+from fastapi_gino_viewsets.cache import LRUCacheBackend
+from fastapi_gino_viewsets.mixins import CacheMixin, ETagMixin
+from fastapi_gino_viewsets.viewsets import ReadOnlyViewSet, ViewSet
+from tests.models import User
+
+app = FastAPI()
+router = MainRouter()
+client = TestClient(app)
+
+
+@router.add_view('/etag')
+class UserETagViewSet(ETagMixin, ViewSet):
+    model = User
+
+
+@router.add_view('/etag_column')
+class UserETagColumnViewSet(ETagMixin, ReadOnlyViewSet):
+    model = User
+    etag_column = 'id'
+
+
+@router.add_view('/etag_cached')
+class UserCachedETagViewSet(CacheMixin, ETagMixin, ReadOnlyViewSet):
+    model = User
+    cache_backend = LRUCacheBackend()
+
+
+@router.add_view('/etag_column_cached')
+class UserCachedETagColumnViewSet(CacheMixin, ETagMixin, ReadOnlyViewSet):
+    model = User
+    etag_column = 'id'
+    cache_backend = LRUCacheBackend()
+
+
+app.include_router(router)
+
+
+@pytest.mark.parametrize('url', ['/etag', '/etag/1', '/etag?sort=-age&limit=2'])
+def test_body_etag(engine, create_users, url):
+    with client:
+        response = client.get(url)
+        etag = response.headers['etag']
+        assert response.status_code == 200
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['etag'] == etag
+        assert not response.content
+
+
+def test_body_etag_changes_with_data(engine, create_users):
+    with client:
+        etag = client.get('/etag/1').headers['etag']
+        client.patch('/etag/1', json={'nickname': 'Changed'})
+        response = client.get('/etag/1', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['etag'] != etag
+
+
+@pytest.mark.parametrize('url', ['/etag_column', '/etag_column/2', '/etag_column?age__le=30'])
+def test_column_etag(engine, create_users, url):
+    with client:
+        response = client.get(url)
+        etag = response.headers['etag']
+        assert response.status_code == 200
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+        assert client.get(url, headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_column_etag_changes_with_row_count(engine, create_users):
+    with client:
+        etag = client.get('/etag_column').headers['etag']
+        client.delete('/etag/1')
+        response = client.get('/etag_column', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['etag'] != etag
+
+
+def test_column_etag_missing_object(engine, create_users):
+    with client:
+        assert client.get('/etag_column/100', headers={'If-None-Match': '*'}).status_code == 404
+
+
+@pytest.mark.parametrize('url, uncached_url', [
+    ('/etag_cached/2', '/etag/2'),
+    ('/etag_cached?sort=-age', '/etag?sort=-age'),
+    ('/etag_column_cached/2', '/etag_column/2'),
+    ('/etag_column_cached?age__le=30', '/etag_column?age__le=30'),
+])
+def test_cached_etag(engine, create_users, url, uncached_url):
+    with client:
+        etag = client.get(uncached_url).headers['etag']
+        assert client.get(url).headers['etag'] == etag
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['etag'] == etag
+        assert client.get(url).headers['etag'] == etag
@@ -0,0 +1,41 @@
+import csv
+import io
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fastapi_gino_viewsets import MainRouter
+from fastapi_gino_viewsets.mixins import ExportMixin, ListModelMixin
+from tests.models import User
+
+app = FastAPI()
+router = MainRouter()
+client = TestClient(app)
+
+
+@router.add_view('/export_view')
+class UserExportView(ExportMixin, ListModelMixin):
+    model = User
+    export_chunk_size = 2
+
+
+app.include_router(router)
+
+
+def test_export_ndjson(engine, create_users):
+    with client:
+        response = client.get('/export_view/export?format=ndjson&sort=-age')
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('application/x-ndjson')
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row['age'] for row in rows] == [50, 40, 30, 20, 10]
+
+
+def test_export_csv(engine, create_users):
+    with client:
+        response = client.get('/export_view/export?format=csv&age__le=30&fields=id,nickname')
+        assert response.status_code == 200
+        assert 'users.csv' in response.headers['content-disposition']
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows == [['id', 'nickname'], ['1', 'Alex1'], ['2', 'Alex2'], ['3', 'Alex3']]
@@ -0,0 +1,104 @@
+import pytest
+import sqlalchemy as sa
+from fastapi import HTTPException
+from sqlalchemy.dialects.postgresql import JSONB
+
+from fastapi_gino_viewsets.indexes import IndexAdvisor, get_declared_indexes, parse_index_definition
+from fastapi_gino_viewsets.mixins import ListModelMixin
+from fastapi_gino_viewsets.viewsets import ViewSet
+from tests.models import User
+
+USER_INDEXES = [
+    parse_index_definition('users_pkey', 'CREATE UNIQUE INDEX users_pkey ON public.users USING btree (id)'),
+    parse_index_definition('ix_name', 'CREATE INDEX ix_name ON public.users USING btree (name DESC NULLS LAST, id)'),
+    parse_index_definition(
+        'ix_age', "CREATE INDEX ix_age ON public.users USING btree ((((props ->> 'age'::text))::integer))",
+    ),
+    parse_index_definition('ix_props', 'CREATE INDEX ix_props ON public.users USING gin (props jsonb_path_ops)'),
+]
+
+
+@pytest.mark.parametrize('definition, method, keys, opclasses', [
+    ('CREATE UNIQUE INDEX users_pkey ON public.users USING btree (id)', 'btree', ('id',), (None,)),
+    (
+        'CREATE INDEX ix ON public.users USING btree (name COLLATE "C" text_pattern_ops, id) INCLUDE (type)',
+        'btree', ('name', 'id'), ('text_pattern_ops', None),
+    ),
+    (
+        "CREATE INDEX ix ON public.users USING gin (((props -> 'email_list'::text)))",
+        'gin', ("props->'email_list'",), (None,),
+    ),
+])
+def test_parse_index_definition(definition, method, keys, opclasses):
+    index = parse_index_definition('ix', definition)
+    assert (index.method, index.keys, index.opclasses) == (method, keys, opclasses)
+
+
+def test_partial_indexes_are_skipped():
+    assert parse_index_definition('ix', 'CREATE INDEX ix ON users USING btree (name) WHERE (id > 10)') is None
+
+
+def test_declared_indexes():
+    table = sa.Table(
+        'documents', sa.MetaData(),
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('slug', sa.String, unique=True),
+        sa.Column('author', sa.String, index=True),
+        sa.Column('props', JSONB),
+    )
+    sa.Index('ix_documents_score', sa.cast(table.c.props['score'].astext, sa.Integer))
+    sa.Index('ix_documents_props', table.c.props, postgresql_using='gin', postgresql_ops={'props': 'jsonb_path_ops'})
+    indexes = {(index.method, index.keys, index.opclasses) for index in get_declared_indexes(table)}
+    assert indexes == {
+        ('btree', ('id',), (None,)),
+        ('btree', ('slug',), (None,)),
+        ('btree', ('author',), (None,)),
+        ('btree', ("props->>'score'::integer",), (None,)),
+        ('gin', ('props',), ('jsonb_path_ops',)),
+    }
+
+
+def test_index_advisor():
+    class AdvisedUserViewSet(ViewSet):
+        model = User
+        filter_schema = None
+
+    advisor = IndexAdvisor()
+    advice = {item.ddl: item for item in advisor.advise_view(AdvisedUserViewSet, USER_INDEXES)}
+    assert "CREATE INDEX ix_users_props_realname ON users USING btree ((props ->> 'realname'));" in advice
+    key_advice = advice["CREATE INDEX ix_users_props_email_list ON users USING gin ((props -> 'email_list'));"]
+    assert key_advice.filters == ('email_list__has', 'email_list__has_any', 'email_list__has_all')
+    assert advice['CREATE INDEX ix_users_type ON users USING btree (type);'].sort == ('type',)
+    reported = {field for item in advice.values() for field in item.filters + item.sort}
+    assert not reported & {'id', 'nickname', 'age__ge', 'email_list'}
+    assert 'AdvisedUserViewSet: filter by type and sort by type without index' in advisor.render()
+
+
+def test_strict_indexes():
+    class StrictUserViewSet(ListModelMixin):
+        model = User
+        filter_schema = None
+        strict_indexes = True
+
+    assert list(StrictUserViewSet.filter_schema.__dataclass_fields__) == ['id']
+    StrictUserViewSet.check_sort(['-id'])
+    with pytest.raises(HTTPException) as exc_info:
+        StrictUserViewSet.check_sort(['id', '-nickname'])
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail.endswith(': -nickname')
+
+
+def test_index_advisor_search_vector():
+    class SearchUserViewSet(ListModelMixin):
+        model = User
+        search_fields = ('nickname', 'realname')
+
+    advisor = IndexAdvisor()
+    advice, = [item for item in advisor.advise_view(SearchUserViewSet, USER_INDEXES) if item.filters == ('q',)]
+    assert advice.ddl.startswith("CREATE INDEX ix_users_search ON users USING gin ((to_tsvector('english', ")
+    search_index = parse_index_definition('ix_users_search', (
+        "CREATE INDEX ix_users_search ON public.users USING gin (to_tsvector('english'::regconfig, "
+        "(((COALESCE(name, ''::character varying))::text || ' '::text) "
+        "|| COALESCE((props ->> 'realname'::text), ''::text))))"
+    ))
+    assert not [item for item in advisor.advise_view(SearchUserViewSet, [search_index]) if item.filters == ('q',)]
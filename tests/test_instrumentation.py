@@ -0,0 +1,89 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import Response
+
+from fastapi_gino_viewsets import MainRouter
+from fastapi_gino_viewsets.instrumentation import PrometheusHook, Trace
+from fastapi_gino_viewsets.mixins import InstrumentationMixin
+from fastapi_gino_viewsets.serialization import ResponseRenderer
+from fastapi_gino_viewsets.viewsets import ViewSet
+from tests.models import User
+
+app = FastAPI()
+router = MainRouter()
+client = TestClient(app)
+hook = PrometheusHook(prefix='test')
+
+
+@router.add_view('/instrumented')
+class UserInstrumentedViewSet(InstrumentationMixin, ViewSet):
+    model = User
+    instrumentation_hooks = (hook,)
+    server_timing = True
+
+
+router.add_metrics_route('/metrics', hook=hook)
+app.include_router(router)
+
+
+def test_trace_server_timing():
+    trace = Trace('View', 'retrieve_list')
+    trace.add('fetch', 0.0125, statements=1)
+    trace.add('fetch', 0.0025)
+    trace.finish()
+    assert trace.statements == 1
+    assert trace.server_timing.startswith('fetch;dur=15.00, app;dur=')
+
+
+def test_prometheus_hook_render():
+    prometheus = PrometheusHook(prefix='demo')
+    trace = Trace('View', 'retrieve')
+    trace.add('fetch', 0.02, statements=1)
+    trace.rows = 1
+    trace.finish()
+    trace.duration = 0.03
+    prometheus.record(trace)
+    output = prometheus.render()
+    assert 'demo_request_duration_seconds_bucket{view="View",method="retrieve",le="0.025"} 0' in output
+    assert 'demo_request_duration_seconds_bucket{view="View",method="retrieve",le="0.05"} 1' in output
+    assert 'demo_phase_duration_seconds_count{view="View",method="retrieve",phase="fetch"} 1' in output
+    assert 'demo_rows_total{view="View",method="retrieve"} 1' in output
+    assert 'demo_statements_total{view="View",method="retrieve"} 1' in output
+
+
+def test_default_serialization_is_measured():
+    prometheus = PrometheusHook(prefix='default')
+
+    class UserMeasuredViewSet(UserInstrumentedViewSet):
+        instrumentation_hooks = (prometheus,)
+
+    async def retrieve():
+        return User(id=1, nickname='Alex', required='req')
+
+    render = ResponseRenderer(UserMeasuredViewSet, UserMeasuredViewSet.output_schema)
+    endpoint = UserMeasuredViewSet.instrument_endpoint('retrieve', retrieve, render)
+    response = asyncio.get_event_loop().run_until_complete(endpoint(_timing_response=Response()))
+    assert response.body.startswith(b'{"id":1,')
+    output = prometheus.render()
+    labels = 'view="UserMeasuredViewSet",method="retrieve"'
+    assert f'default_serialized_bytes_total{{{labels}}} {len(response.body)}' in output
+    assert f'default_phase_duration_seconds_count{{{labels},phase="serialize"}} 1' in output
+
+
+def test_server_timing_header(engine, create_users):
+    with client:
+        response = client.get('/instrumented?limit=2&sort=-age')
+        assert response.status_code == 200
+        timing = response.headers['server-timing']
+        names = [item.split(';')[0] for item in timing.split(', ')]
+        assert {'get_query', 'sort', 'total', 'paginate', 'fetch', 'serialize', 'app'} <= set(names)
+        assert len(names) == len(set(names))
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert 'test_rows_total{view="UserInstrumentedViewSet",method="retrieve_list"} 2' in response.text
+        assert 'test_statements_total{view="UserInstrumentedViewSet",method="retrieve_list"} 2' in response.text
+        labels = 'view="UserInstrumentedViewSet",method="retrieve_list"'
+        assert f'test_serialized_bytes_total{{{labels}}} 0' not in response.text
+        assert f'test_serialized_bytes_total{{{labels}}}' in response.text
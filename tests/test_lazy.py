@@ -0,0 +1,87 @@
+import inspect
+
+from fastapi_gino_viewsets import MainRouter
+from fastapi_gino_viewsets.lazy import LazyAttribute, StartupReport, materialize, startup_report
+from fastapi_gino_viewsets.schemas import BaseWrapperSchema
+from fastapi_gino_viewsets.viewsets import ViewSet
+from tests.models import User
+
+
+def lazy_attributes(view):
+    return {name: value for name, value in vars(view).items() if isinstance(value, LazyAttribute)}
+
+
+def test_schemas_are_built_on_first_access():
+    class LazyUserViewSet(ViewSet):
+        model = User
+        filter_schema = None
+
+    attributes = lazy_attributes(LazyUserViewSet)
+    expected = {'input_schema', 'output_schema', 'list_schema', 'filter_schema', 'retrieve_list', 'create'}
+    assert expected <= set(attributes)
+    assert not any(attribute.built for attribute in attributes.values())
+
+    output_schema = LazyUserViewSet.output_schema
+    assert attributes['output_schema'].built
+    assert LazyUserViewSet.output_schema is output_schema
+    assert not attributes['input_schema'].built
+
+    materialize(LazyUserViewSet)
+    assert all(attribute.built for attribute in attributes.values())
+
+
+def test_add_view_materializes_routes():
+    class RoutedUserViewSet(ViewSet):
+        model = User
+
+    startup_report.clear()
+    MainRouter().add_view('/lazy')(RoutedUserViewSet)
+    attributes = lazy_attributes(RoutedUserViewSet)
+    assert attributes['list_schema'].built and attributes['update'].built
+    timings = startup_report.views[f'{__name__}.{RoutedUserViewSet.__qualname__}']
+    assert {'add_view', 'list_schema', 'update'} <= set(timings)
+
+
+def test_subclass_inherits_built_schemas():
+    class ParentViewSet(ViewSet):
+        model = User
+
+    class ChildViewSet(ParentViewSet):
+        pass
+
+    assert ChildViewSet.output_schema is ParentViewSet.output_schema
+    assert ChildViewSet.list_schema is ParentViewSet.list_schema
+    assert ChildViewSet.retrieve_list.__self__ is ChildViewSet
+
+
+def test_subclass_overrides_are_used():
+    class WrapperSchema(BaseWrapperSchema):
+        __wrapper_key__ = 'data'
+
+    class ParentViewSet(ViewSet):
+        model = User
+
+    class ChildViewSet(ParentViewSet):
+        cursor_pagination = True
+        wrapper_schema = WrapperSchema
+        key_name = 'user_id'
+
+    assert ParentViewSet.list_schema.__name__ == 'UserListSchema'
+    assert ChildViewSet.list_schema.__name__ == 'UserWrapperCursorListSchema'
+    assert ParentViewSet.output_schema.__name__ == 'UserOutputSchema'
+    assert list(ChildViewSet.output_schema.__fields__) == ['data']
+    assert ChildViewSet.delete.__self__ is ChildViewSet
+    assert inspect.signature(ChildViewSet.delete).parameters['param'].default.alias == 'user_id'
+    assert inspect.signature(ParentViewSet.delete).parameters['param'].default.alias == 'id'
+    assert lazy_attributes(ParentViewSet)['list_schema'].built
+
+
+def test_startup_report_nested_timings():
+    report = StartupReport()
+    with report.measure('app.View', 'add_view'):
+        with report.measure('app.View', 'output_schema'):
+            pass
+    timings = report.views['app.View']
+    assert set(timings) == {'add_view', 'output_schema'}
+    assert report.total == sum(timings.values())
+    assert report.render().splitlines()[-1].endswith('total for 1 viewsets')
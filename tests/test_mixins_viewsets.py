@@ -1,11 +1,22 @@
+import asyncio
+import inspect
+
 import pytest
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 from fastapi.testclient import TestClient
+from ginodantic import BaseModelSchema
+from pydantic import validator
+from sqlalchemy.dialects import postgresql
 
+from fastapi_gino_viewsets import mixins
 from fastapi_gino_viewsets.schemas import BaseSchema
 from fastapi_gino_viewsets.mixins import (
     AggregateObjectMixin,
+    BatchRetrieveModelMixin,
+    BulkCreateModelMixin,
+    BulkDeleteModelMixin,
+    BulkUpdatePartialModelMixin,
     CreateModelMixin,
     DeleteModelMixin,
     ListModelMixin,
@@ -14,9 +25,10 @@ from fastapi_gino_viewsets.mixins import (
     RetrieveModelMixin,
 
 )
+from fastapi_gino_viewsets.schema_factory import SchemaFactory
 from fastapi_gino_viewsets.viewsets import ReadOnlyViewSet, ViewSet
 from fastapi_gino_viewsets.router import MainRouter
-from tests.models import User, UserType, db
+from tests.models import Team, User, UserType, db
 from tests.utils import NoNoneDict
 
 app = FastAPI()
@@ -55,16 +67,73 @@ class UserRetrieveView(RetrieveModelMixin):
     model = User
 
 
+@router.add_view('/batch_get', response_class=JSONResponse)
+class UserBatchRetrieveView(BatchRetrieveModelMixin):
+    model = User
+    batch_max_size = 5
+
+
 @router.add_view('/list', response_class=JSONResponse)
 class UserListView(ListModelMixin):
     model = User
 
 
+@router.add_view('/window_list', response_class=JSONResponse)
+class UserWindowCountListView(ListModelMixin):
+    model = User
+    count_strategy = 'window'
+
+
+@router.add_view('/estimate_list', response_class=JSONResponse)
+class UserEstimateCountListView(ListModelMixin):
+    model = User
+    count_strategy = 'estimate'
+
+
+@router.add_view('/search_list', response_class=JSONResponse)
+class UserSearchListView(ListModelMixin):
+    model = User
+    search_fields = ('nickname', 'realname')
+    search_rank = True
+
+
+@router.add_view('/limited_list', response_class=JSONResponse)
+class UserLimitedListView(ListModelMixin):
+    model = User
+    default_limit = 2
+    max_limit = 3
+
+
+@router.add_view('/clamped_list', response_class=JSONResponse)
+class UserClampedListView(ListModelMixin):
+    model = User
+    max_limit = 3
+    clamp_limit = True
+
+
+@router.add_view('/cursor_list', response_class=JSONResponse)
+class UserCursorListView(ListModelMixin):
+    model = User
+    cursor_pagination = True
+
+
 @router.add_view('/create', response_class=JSONResponse)
 class UserCreateView(CreateModelMixin):
     model = User
 
 
+@router.add_view('/bulk_create', response_class=JSONResponse)
+class UserBulkCreateView(BulkCreateModelMixin):
+    model = User
+    bulk_create_chunk_size = 2
+
+
+@router.add_view('/bulk_copy', response_class=JSONResponse)
+class UserBulkCopyView(BulkCreateModelMixin):
+    model = User
+    bulk_create_returning = False
+
+
 @router.add_view('/update', response_class=JSONResponse)
 class UserUpdateView(UpdateModelMixin):
     model = User
@@ -75,16 +144,58 @@ class UserUpdatePartialView(UpdatePartialModelMixin):
     model = User
 
 
+@router.add_view('/bulk_update_partial', response_class=JSONResponse)
+class UserBulkUpdatePartialView(BulkUpdatePartialModelMixin):
+    model = User
+
+
 @router.add_view('/delete', response_class=JSONResponse)
 class UserDeleteView(DeleteModelMixin):
     model = User
 
 
+@router.add_view('/bulk_delete', response_class=JSONResponse)
+class UserBulkDeleteView(BulkDeleteModelMixin, DeleteModelMixin):
+    model = User
+
+
 @router.add_view('/read_only', response_class=JSONResponse)
 class UserReadOnlyView(ReadOnlyViewSet):
     model = User
 
 
+@router.add_view('/trusted', response_class=JSONResponse)
+class UserTrustedReadOnlyView(ReadOnlyViewSet):
+    model = User
+    trusted_serialization = True
+
+
+@router.add_view('/trusted_short', response_class=JSONResponse)
+class UserTrustedShortReadOnlyView(UserTrustedReadOnlyView):
+    output_schema = SchemaFactory.output_schema(
+        User, BaseModelSchema, schema_name='UserShortOutputSchema', exclude=('required', 'age'),
+    )
+
+
+class UserUpperOutputSchema(SchemaFactory.output_schema(User, BaseModelSchema)):
+
+    @validator('nickname')
+    def upper_nickname(cls, value):
+        return value.upper()
+
+
+@router.add_view('/validated', response_class=JSONResponse)
+class UserValidatedReadOnlyView(ReadOnlyViewSet):
+    model = User
+    output_schema = UserUpperOutputSchema
+
+
+@router.add_view('/expand', response_class=JSONResponse)
+class UserExpandReadOnlyView(ReadOnlyViewSet):
+    model = User
+    expand_fields = {'team': Team}
+
+
 @router.add_view('/viewset', response_class=JSONResponse)
 class UserViewset(ViewSet):
     model = User
@@ -101,6 +212,24 @@ def test_retrieve_mixin(engine, get_users):
         assert data['age'] == 10
 
 
+@pytest.mark.parametrize('query, expected_ids, expected_missing', [
+        ('?id=3&id=1', [3, 1], []),
+        ('?id=2&id=42&id=5', [2, 5], [42]),
+        ('?id=4&id=4', [4], []),
+])
+def test_batch_retrieve_mixin(engine, create_users, query, expected_ids, expected_missing):
+    with client:
+        data = client.get('/batch_get/batch' + query).json()
+        assert [x['id'] for x in data['data']] == expected_ids
+        assert data['missing'] == expected_missing
+
+
+def test_batch_retrieve_too_many_keys(engine, create_users):
+    with client:
+        response = client.get('/batch_get/batch?' + '&'.join(f'id={n}' for n in range(1, 7)))
+        assert response.status_code == 400
+
+
 def test_list_mixin(engine, get_users):
     users = get_users()
     with client:
@@ -115,6 +244,10 @@ def test_list_mixin(engine, get_users):
         ('?nickname=Alex2', 1),
         ('?ignore_me=true', 5),
         ('?email_list=user1@gmail.com&email_list=user1@yahoo.com', 1),
+        ('?email_list__has=user2@gmail.com', 1),
+        ('?email_list__has_any=user1@gmail.com&email_list__has_any=user3@yahoo.com', 2),
+        ('?email_list__has_all=user1@gmail.com&email_list__has_all=user2@yahoo.com', 0),
+        ('?age__ge=20&age__le=40', 3),
 ])
 def test_list_mixin_filters(engine, create_users, filters, expected_total):
     with client:
@@ -122,6 +255,58 @@ def test_list_mixin_filters(engine, create_users, filters, expected_total):
         assert data['pagination']['total'] == expected_total
 
 
+@pytest.mark.parametrize('url, expected_data', [
+        ('/list?fields=nickname,age&limit=2', [{'nickname': 'Alex1', 'age': 10}, {'nickname': 'Alex2', 'age': 20}]),
+        ('/list?fields=id&sort=-age&limit=2', [{'id': 5}, {'id': 4}]),
+        ('/get/3?fields=id,nickname', {'id': 3, 'nickname': 'Alex3'}),
+])
+def test_sparse_fieldsets(engine, create_users, url, expected_data):
+    with client:
+        data = client.get(url).json()
+        if isinstance(expected_data, list):
+            assert data['data'] == expected_data
+            assert data['pagination']['total'] == 5
+        else:
+            assert data == expected_data
+
+
+@pytest.mark.parametrize('filters', [
+        {'id': [1, 2]},
+        {'age__le': 30, 'nickname': 'Alex2'},
+        {'email_list': ['user1@gmail.com']},
+        {'email_list__has_any': ['user1@gmail.com'], 'birthday__ge': '2020-01-01T00:00:00'},
+])
+def test_filter_plan_matches_handler(filters):
+    filter_schema = UserListView.filter_schema(**filters)
+    planned = UserListView.filter_query(None, User.query, filter_schema)
+    handled = User.query.where(db.and_(
+        UserListView._handler_filter(User, name, value) for name, value in UserListView.get_filters(filter_schema)
+    ))
+    assert set(UserListView.filter_plan) >= set(filters)
+    dialect = postgresql.dialect()
+    assert str(planned.compile(dialect=dialect)) == str(handled.compile(dialect=dialect))
+
+
+@pytest.mark.parametrize('url, status_code, expected_limit, expected_requested_limit', [
+        ('/limited_list', 200, 2, None),
+        ('/limited_list?limit=3', 200, 3, None),
+        ('/limited_list?limit=4', 422, None, None),
+        ('/limited_list?limit=0', 422, None, None),
+        ('/clamped_list', 200, 3, None),
+        ('/clamped_list?limit=10', 200, 3, 10),
+        ('/clamped_list?limit=0', 200, 3, 0),
+])
+def test_list_limits(engine, create_users, url, status_code, expected_limit, expected_requested_limit):
+    with client:
+        response = client.get(url)
+        assert response.status_code == status_code
+        if status_code == 200:
+            data = response.json()
+            assert len(data['data']) == expected_limit
+            assert data['pagination']['limit'] == expected_limit
+            assert data['pagination']['requested_limit'] == expected_requested_limit
+
+
 @pytest.mark.parametrize('sort, expected_id_list', [
         ('?sort=-name', [5, 4, 3, 2, 1]),
         ('?sort=type&sort=-age', [4, 2, 5, 3, 1]),
@@ -133,6 +318,119 @@ def test_sort(engine, create_users, sort, expected_id_list):
         assert [item["id"] for item in data["data"]] == expected_id_list
 
 
+@pytest.mark.parametrize('url, expected_total, expected_count_strategy', [
+        ('/list', 5, 'exact'),
+        ('/list?with_total=false', None, 'none'),
+        ('/window_list', 5, 'window'),
+        ('/window_list?age__le=30&limit=2', 3, 'window'),
+        ('/window_list?offset=10', 5, 'window'),
+        ('/window_list?with_total=false', None, 'none'),
+])
+def test_list_count_strategy(engine, create_users, url, expected_total, expected_count_strategy):
+    with client:
+        data = client.get(url).json()
+        assert data['pagination']['total'] == expected_total
+        assert data['pagination']['count_strategy'] == expected_count_strategy
+
+
+@pytest.mark.parametrize('query, expected_ids, expected_total', [
+        ('?q=alex3', [3], 1),
+        ('?q=alex4 or alex2', [2, 4], 2),
+        ('?q=alex4 or alex2&limit=1&offset=1', [4], 2),
+        ('?q=alex4 or alex2&with_total=false', [2, 4], None),
+        ('?q=-alex1&age__le=30', [2, 3], 2),
+        ('?q=alex1&sort=-id', [1], 1),
+        ('?q=nobody', [], 0),
+])
+def test_list_search(engine, create_users, query, expected_ids, expected_total):
+    with client:
+        data = client.get('/search_list' + query).json()
+        assert [item['id'] for item in data['data']] == expected_ids
+        assert data['pagination']['total'] == expected_total
+
+
+def test_search_query_uses_vector_expression():
+    filter_schema = UserSearchListView.filter_schema(q='alex')
+    query = UserSearchListView.filter_query(None, User.query, filter_schema)
+    query = UserSearchListView.rank_query(None, query, filter_schema)
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    vector = "to_tsvector('english', coalesce(users.name, '') || ' ' || coalesce((users.props ->> 'realname'), ''))"
+    assert f"{vector} @@ websearch_to_tsquery('english', %(filter_q)s)" in sql
+    assert sql.endswith(f"ORDER BY ts_rank({vector}, websearch_to_tsquery('english', %(filter_q)s)) DESC, users.id")
+    assert 'q' not in UserListView.filter_schema.__dataclass_fields__
+
+
+@pytest.mark.parametrize('filters', ['', '?age__le=30'])
+def test_list_estimate_count_strategy(engine, create_users, filters):
+    with client:
+        data = client.get('/estimate_list' + filters).json()
+        assert isinstance(data['pagination']['total'], int)
+        assert data['pagination']['count_strategy'] == 'estimate'
+        assert len(data['data']) == (3 if filters else 5)
+
+
+def test_unfiltered_query_has_no_where_clause():
+    view = UserEstimateCountListView
+    assert view.filter_query(None, User.query, view.filter_schema())._whereclause is None
+    assert view.filter_query(None, User.query, view.filter_schema(age__le=30))._whereclause is not None
+
+
+def test_list_estimate_uses_reltuples_without_filters(engine, create_users, monkeypatch):
+    explained = []
+    original_explain = mixins.Explain
+
+    def explain(query, *options):
+        explained.append(query)
+        return original_explain(query, *options)
+
+    monkeypatch.setattr(mixins, 'Explain', explain)
+    asyncio.get_event_loop().run_until_complete(db.status('ANALYZE users'))
+    with client:
+        assert client.get('/estimate_list').json()['pagination']['total'] == 5
+        assert not explained
+        client.get('/estimate_list?age__le=30')
+        assert len(explained) == 1
+
+
+@pytest.mark.parametrize('sort, expected_id_list', [
+        ('', [1, 2, 3, 4, 5]),
+        ('&sort=-age', [5, 4, 3, 2, 1]),
+        ('&sort=type&sort=-age', [4, 2, 5, 3, 1]),
+])
+def test_cursor_list_mixin(engine, create_users, sort, expected_id_list):
+    ids = []
+    with client:
+        data = client.get(f'/cursor_list?limit=2{sort}').json()
+        ids.extend(item['id'] for item in data['data'])
+        while data['pagination']['next_cursor']:
+            cursor = data['pagination']['next_cursor']
+            data = client.get(f'/cursor_list?limit=2&cursor={cursor}{sort}').json()
+            ids.extend(item['id'] for item in data['data'])
+    assert ids == expected_id_list
+
+
+@pytest.mark.parametrize('sort', ['&sort=nickname', '&sort=-nickname', '&sort=-nickname&sort=age'])
+def test_cursor_list_keeps_null_sort_values(engine, create_users, sort):
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(User.update.values(name=None).where(User.id.in_([2, 4])).gino.status())
+    ids = []
+    with client:
+        data = client.get(f'/cursor_list?limit=2{sort}').json()
+        ids.extend(item['id'] for item in data['data'])
+        while data['pagination']['next_cursor']:
+            cursor = data['pagination']['next_cursor']
+            data = client.get(f'/cursor_list?limit=2&cursor={cursor}{sort}').json()
+            ids.extend(item['id'] for item in data['data'])
+    expected = [1, 3, 5, 2, 4] if sort == '&sort=nickname' else [2, 4, 5, 3, 1]
+    assert ids == expected
+
+
+def test_cursor_list_invalid_cursor(engine, create_users):
+    with client:
+        response = client.get('/cursor_list?limit=2&cursor=broken')
+        assert response.status_code == 400
+
+
 def test_aggregation_mixin(engine, create_users):
     with client:
         data = client.get('/aggregate').json()
@@ -147,6 +445,34 @@ def test_create_mixin(engine):
     assert NoNoneDict(data) == test_data
 
 
+def test_bulk_create_mixin(engine):
+    items = [{**test_data, 'nickname': f'Admin{n}', 'age': n} for n in range(5)]
+    with client:
+        data = client.post('/bulk_create/bulk', json=items).json()
+        assert [item['nickname'] for item in data] == [item['nickname'] for item in items]
+        assert [item['age'] for item in data] == list(range(5))
+        assert len({item['id'] for item in data}) == 5
+
+
+def test_bulk_create_copy_mixin(engine):
+    items = [{**test_data, 'nickname': f'Admin{n}'} for n in range(3)]
+    with client:
+        data = client.post('/bulk_copy/bulk', json=items).json()
+        assert data['count'] == 3
+        data = client.get('/list?nickname=Admin2').json()
+        assert data['pagination']['total'] == 1
+        assert data['data'][0]['age'] == test_data['age']
+
+
+def test_bulk_create_validates_whole_batch(engine):
+    items = [test_data, {'nickname': 'no required field'}]
+    with client:
+        response = client.post('/bulk_create/bulk', json=items)
+        assert response.status_code == 422
+        data = client.get('/list').json()
+        assert data['pagination']['total'] == 0
+
+
 def test_update_mixin(engine, create_users):
     with client:
         data = client.put('/update/1', json=test_data).json()
@@ -167,6 +493,60 @@ def test_update_partial_mixin(engine, create_users):
     assert {data[k] == partial_data[k] for k, v in partial_data.items()}
 
 
+@pytest.mark.parametrize('url, method', [
+    ('/update/100', 'put'),
+    ('/update_partial/100', 'patch'),
+])
+def test_update_missing_object(engine, create_users, url, method):
+    with client:
+        result = getattr(client, method)(url, json=test_data)
+        assert result.status_code == 404
+
+
+def test_update_partial_json_properties(engine, create_users):
+    with client:
+        data = client.patch('/update_partial/2', json={'age': 99}).json()
+        assert data['age'] == 99
+        assert data['nickname'] == 'Alex2'
+        assert data['email_list'] == ['user2@gmail.com', 'user2@yahoo.com']
+
+
+@pytest.mark.parametrize('query, expected_keys', [
+        ('?id=1&id=3', [1, 3]),
+        ('?age__ge=40', [4, 5]),
+        ('?id=1&id=2&age__ge=20', [2]),
+        ('?id=100', []),
+])
+def test_bulk_update_partial_mixin(engine, create_users, query, expected_keys):
+    with client:
+        data = client.patch('/bulk_update_partial' + query, json={'realname': 'Bulk', 'age': 77}).json()
+        assert sorted(data['keys']) == expected_keys
+        assert data['count'] == len(expected_keys)
+        data = client.get('/list?age__ge=77').json()
+        assert sorted(item['id'] for item in data['data']) == expected_keys
+        assert all(item['realname'] == 'Bulk' for item in data['data'])
+
+
+@pytest.mark.parametrize('query, body', [
+        ('', {'realname': 'Bulk'}),
+        ('?keys=1', {'realname': 'Bulk'}),
+        ('?id=1', {}),
+])
+def test_bulk_update_partial_bad_request(engine, create_users, query, body):
+    with client:
+        response = client.patch('/bulk_update_partial' + query, json=body)
+        assert response.status_code == 400
+
+
+def test_bulk_update_partial_selects_like_bulk_delete():
+    update_params = inspect.signature(UserBulkUpdatePartialView.update_partial_list).parameters
+    delete_params = inspect.signature(UserBulkDeleteView.delete_list).parameters
+    assert 'keys' not in update_params
+    assert update_params['filters'].annotation is UserBulkUpdatePartialView.filter_schema
+    assert delete_params['filters'].annotation is UserBulkDeleteView.filter_schema
+    assert 'id' in UserBulkUpdatePartialView.filter_schema.__dataclass_fields__
+
+
 def test_delete_mixin(engine, create_users):
     user = create_users[0]
     with client:
@@ -176,6 +556,27 @@ def test_delete_mixin(engine, create_users):
         assert data.status_code == 404
 
 
+@pytest.mark.parametrize('filters, expected_keys', [
+        ('?id=1&id=2', [1, 2]),
+        ('?age__ge=40', [4, 5]),
+        ('?id=100', []),
+])
+def test_bulk_delete_mixin(engine, create_users, filters, expected_keys):
+    with client:
+        data = client.delete('/bulk_delete' + filters).json()
+        assert sorted(data['keys']) == expected_keys
+        assert data['count'] == len(expected_keys)
+        data = client.get('/list').json()
+        assert data['pagination']['total'] == 5 - len(expected_keys)
+
+
+def test_bulk_delete_requires_filters(engine, create_users):
+    with client:
+        response = client.delete('/bulk_delete')
+        assert response.status_code == 400
+        assert client.delete('/bulk_delete/1').json()['id'] == 1
+
+
 def test_read_only_viewset(engine, get_users):
     users = get_users()
     with client:
@@ -187,6 +588,67 @@ def test_read_only_viewset(engine, get_users):
         assert data['age'] == 20
 
 
+@pytest.mark.parametrize('url', ['', '/2', '?sort=-age&limit=2'])
+def test_trusted_serialization(engine, create_users, url):
+    with client:
+        trusted = client.get('/trusted' + url)
+        validated = client.get('/read_only' + url)
+        assert trusted.headers['content-type'] == 'application/json'
+        assert trusted.json() == validated.json()
+
+
+def test_subclass_output_schema_is_serialized():
+    view = UserTrustedShortReadOnlyView
+    assert view.output_schema.__name__ == 'UserShortOutputSchema'
+    assert not {'required', 'age'} & set(view.serializer.names)
+    assert not {'required', 'age'} & set(view.output_columns)
+    assert {'required', 'age'} <= set(UserTrustedReadOnlyView.serializer.names)
+
+
+@pytest.mark.parametrize('url', ['/trusted_short', '/trusted_short/2', '/trusted_short?sort=-age&limit=2'])
+def test_subclass_output_schema_response(engine, create_users, url):
+    with client:
+        data = client.get(url).json()
+    for item in data['data'] if 'data' in data else [data]:
+        assert 'id' in item
+        assert not {'required', 'age'} & set(item)
+
+
+@pytest.mark.parametrize('url', ['/validated/1', '/validated?id=1'])
+def test_sparse_fieldsets_are_validated(engine, create_users, url):
+    with client:
+        full = client.get(url).json()
+        sparse = client.get(url, params={'fields': 'id,nickname'}).json()
+    if 'data' in full:
+        full, sparse = full['data'][0], sparse['data'][0]
+    assert full['nickname'] == 'ALEX1'
+    assert sparse == {'id': 1, 'nickname': 'ALEX1'}
+
+
+@pytest.mark.parametrize('url', ['/trusted_short/1', '/trusted_short?id=1'])
+def test_sparse_fieldsets_are_limited_to_output_schema(engine, create_users, url):
+    with client:
+        data = client.get(url, params={'fields': 'id,age,required'}).json()
+    assert (data['data'][0] if 'data' in data else data) == {'id': 1}
+
+
+@pytest.mark.parametrize('url', ['/expand?expand=team', '/expand?expand=team&fields=id,team'])
+def test_expand_list(engine, create_users, url):
+    team_id = create_users[0].team_id
+    with client:
+        data = client.get(url).json()['data']
+        assert len(data) == 5
+        assert all(x['team']['id'] == team_id for x in data)
+
+
+def test_expand_retrieve(engine, create_users):
+    with client:
+        data = client.get('/expand/1?expand=team').json()
+        assert data['team']['id'] == create_users[0].team_id
+        assert client.get('/expand/1').json()['team'] is None
+        assert client.get('/expand/1?expand=owner').status_code == 400
+
+
 def test_viewset(engine):
     with client:
         result = client.post('/viewset', json=test_data).json()
@@ -224,6 +686,7 @@ GET, POST, PUT, PATCH, DELETE = client.get, client.post, client.put, client.patc
     ('/list', {POST}),
     ('/aggregate', {POST, PUT, PATCH, DELETE}),
     ('/create', {GET, PUT, PATCH, DELETE}),
+    ('/bulk_create/bulk', {GET, PUT, PATCH, DELETE}),
     ('/update/1', {GET, POST, PATCH, DELETE}),
     ('/update_partial/1', {GET, POST, PUT, DELETE}),
     ('/delete/1', {GET, POST, PUT, PATCH}),
@@ -249,3 +712,22 @@ def test_all_404(engine, create_users, url, methods):
         for method in methods:
             result = method(url)
             assert result.status_code == 404
+
+
+@pytest.mark.parametrize('filters, expected_sql', [
+        ({'age__ge': 30}, "CAST((users.props ->> 'age') AS INTEGER) >="),
+        ({'email_list': ['user1@gmail.com']}, 'users.props @> %(filter_email_list)s'),
+        ({'email_list__has': 'user1@gmail.com'}, "((users.props -> 'email_list')) ? %(filter_email_list__has)s"),
+        ({'email_list__has_all': ['user1@gmail.com']}, "((users.props -> 'email_list')) ?& "),
+])
+def test_jsonb_filters_are_index_friendly(filters, expected_sql):
+    filter_schema = UserListView.filter_schema(**filters)
+    query = UserListView.filter_query(None, User.query, filter_schema)
+    assert expected_sql in str(query.compile(dialect=postgresql.dialect()))
+
+
+def test_list_schema_names():
+    assert UserListView.list_schema.__name__ == 'UserListSchema'
+    assert UserCursorListView.list_schema.__name__ == 'UserCursorListSchema'
+    assert UserExpandReadOnlyView.list_schema.__name__ == 'UserExpandedTeamListSchema'
+    assert UserCursorListView.list_schema is not UserListView.list_schema
@@ -0,0 +1,107 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from fastapi_gino_viewsets import MainRouter
+from fastapi_gino_viewsets.query_cache import CompiledQueryCache, get_compiled_params
+from fastapi_gino_viewsets.viewsets import ReadOnlyViewSet
+from tests.models import User
+
+app = FastAPI()
+router = MainRouter()
+client = TestClient(app)
+
+
+@router.add_view('/compiled')
+class UserCompiledQueryViewSet(ReadOnlyViewSet):
+    model = User
+    query_cache = CompiledQueryCache()
+
+
+@router.add_view('/compiled_override')
+class UserOverriddenQueryViewSet(ReadOnlyViewSet):
+    model = User
+    query_cache = CompiledQueryCache()
+
+    @classmethod
+    def get_query(cls, request, f=None):
+        return super().get_query(request, f).where(User.id != 1)
+
+
+@router.add_view('/compiled_hooks')
+class UserOverriddenHooksViewSet(ReadOnlyViewSet):
+    model = User
+    query_cache = CompiledQueryCache()
+
+    @classmethod
+    async def total(cls, query):
+        return 12345
+
+    @classmethod
+    async def prepare_data_hook(cls, query):
+        return await query.where(User.id != 2).gino.all()
+
+
+app.include_router(router)
+
+
+def test_compiled_query_cache_reuses_compiled_query():
+    cache = CompiledQueryCache(maxsize=1)
+    dialect = postgresql.dialect()
+    compiled = cache.get('a', lambda: User.query, dialect)
+    assert cache.get('a', lambda: User.query, dialect) is compiled
+    cache.get('b', lambda: User.query, dialect)
+    assert cache.stats == {'hits': 1, 'misses': 2, 'size': 1}
+    cache.clear()
+    assert cache.stats == {'hits': 0, 'misses': 0, 'size': 0}
+
+
+def test_compiled_params_are_taken_from_the_new_statement():
+    def build(email, excluded_id):
+        filter_schema = UserCompiledQueryViewSet.filter_schema(email_list=[email])
+        query = UserCompiledQueryViewSet.filter_query(None, User.query, filter_schema)
+        return query.where(User.id != excluded_id)
+
+    compiled = CompiledQueryCache().get('a', lambda: build('a@x', 1), postgresql.dialect())
+    params = get_compiled_params(compiled, build('b@y', 2), {'limit': 10})
+    assert params == {'filter_email_list': {'email_list': ['b@y']}, 'id_1': 2, 'limit': 10}
+    assert get_compiled_params(compiled, User.query.where(User.id == 1)) is None
+
+
+@pytest.mark.parametrize('urls, expected_ids', [
+    (['/compiled/1', '/compiled/2'], [1, 2]),
+    (['/compiled?id=1&id=2', '/compiled?id=3'], [[1, 2], [3]]),
+    (['/compiled?age__le=20&limit=1', '/compiled?age__le=40&limit=1&offset=3'], [[1], [4]]),
+    (['/compiled?email_list=user1@gmail.com', '/compiled?email_list=user3@yahoo.com'], [[1], [3]]),
+    (['/compiled?email_list__has_any=user2@gmail.com', '/compiled?email_list__has_any=user4@yahoo.com'], [[2], [4]]),
+])
+def test_compiled_query_cache_hits(engine, create_users, urls, expected_ids):
+    cache = UserCompiledQueryViewSet.query_cache
+    cache.clear()
+    with client:
+        for url, expected in zip(urls, expected_ids):
+            data = client.get(url).json()
+            if isinstance(expected, list):
+                assert [x['id'] for x in data['data']] == expected
+            else:
+                assert data['id'] == expected
+    assert cache.stats['misses'] == len(cache)
+    assert cache.stats['hits'] == len(cache)
+
+
+def test_overridden_queries_are_not_cached():
+    assert UserCompiledQueryViewSet.has_default_queries()
+    assert not UserOverriddenQueryViewSet.has_default_queries()
+    query = UserOverriddenQueryViewSet.cached_query(('shape',), lambda: User.query)
+    assert not len(UserOverriddenQueryViewSet.query_cache)
+    assert query is not None
+    assert not UserOverriddenHooksViewSet.has_default_queries()
+
+
+def test_overridden_hooks_are_called(engine, create_users):
+    with client:
+        data = client.get('/compiled_hooks?sort=id').json()
+    assert data['pagination']['total'] == 12345
+    assert [x['id'] for x in data['data']] == [1, 3, 4, 5]
+    assert not len(UserOverriddenHooksViewSet.query_cache)
@@ -0,0 +1,104 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fastapi_gino_viewsets import MainRouter
+from fastapi_gino_viewsets.mixins import ReadReplicaMixin
+from fastapi_gino_viewsets.routing import ReplicaRouter, route_query
+from fastapi_gino_viewsets.viewsets import ViewSet
+from tests.models import User, db
+
+app = FastAPI()
+router = MainRouter()
+client = TestClient(app)
+
+
+class FakeTimer:
+    now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingReplica:
+
+    def __init__(self):
+        self.queries = 0
+
+    async def all(self, *args, **kwargs):
+        self.queries += 1
+        return await db.bind.all(*args, **kwargs)
+
+    async def first(self, *args, **kwargs):
+        self.queries += 1
+        return await db.bind.first(*args, **kwargs)
+
+    async def one_or_none(self, *args, **kwargs):
+        self.queries += 1
+        return await db.bind.one_or_none(*args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        self.queries += 1
+        return await db.bind.scalar(*args, **kwargs)
+
+
+replica = CountingReplica()
+timer = FakeTimer()
+
+
+@router.add_view('/replica')
+class UserReplicaViewSet(ReadReplicaMixin, ViewSet):
+    model = User
+    replica_router = ReplicaRouter([replica], timer=timer)
+
+
+app.include_router(router)
+
+
+def test_round_robin():
+    replica_router = ReplicaRouter(['a', 'b'])
+    indexes = [replica_router.acquire() for _ in range(4)]
+    assert [replica_router.replicas[i] for i in indexes] == ['a', 'b', 'a', 'b']
+
+
+def test_least_busy():
+    replica_router = ReplicaRouter(['a', 'b', 'c'], strategy='least_busy')
+    assert [replica_router.acquire() for _ in range(3)] == [0, 1, 2]
+    replica_router.release(1)
+    assert replica_router.acquire() == 1
+    assert replica_router.in_flight == [1, 1, 1]
+
+
+def test_read_your_writes_window():
+    fake_timer = FakeTimer()
+    replica_router = ReplicaRouter(['a'], read_your_writes=5, timer=fake_timer)
+    replica_router.record_write('client')
+    assert replica_router.acquire('client') is None
+    assert replica_router.acquire('other') == 0
+    fake_timer.now = 5
+    assert replica_router.acquire('client') == 0
+
+
+def test_route_query_without_replica():
+    query = User.query
+    assert route_query(query) is query
+
+
+def test_reads_use_replica(engine, create_users):
+    replica.queries = 0
+    timer.now = 1000
+    with client:
+        assert len(client.get('/replica').json()['data']) == 5
+        assert client.get('/replica/1').json()['id'] == 1
+    assert replica.queries == 3
+
+
+def test_reads_after_write_use_primary(engine, create_users):
+    replica.queries = 0
+    timer.now = 2000
+    headers = {'Authorization': 'Bearer writer'}
+    with client:
+        client.patch('/replica/1', json={'nickname': 'Changed'}, headers=headers)
+        assert client.get('/replica/1', headers=headers).json()['nickname'] == 'Changed'
+        assert replica.queries == 0
+        client.get('/replica/1', headers={'Authorization': 'Bearer reader'})
+        assert replica.queries == 1
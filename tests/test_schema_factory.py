@@ -2,10 +2,11 @@ from datetime import datetime
 
 import pytest
 from ginodantic import BaseModelSchema
-from pydantic import ValidationError
+from pydantic import ValidationError, validator
 
-from tests.models import User, UserType
+from tests.models import Team, User, UserType
 from fastapi_gino_viewsets.schema_factory import SchemaFactory
+from fastapi_gino_viewsets.schemas import BasePaginatedListSchema
 from gino.json_support import DATETIME_FORMAT
 
 
@@ -80,3 +81,41 @@ def test_patch_schema_valid(data, expected_dif):
     assert UserPatchSchema.__name__ == 'UserPatchSchema'
     expected = {**data, **expected_dif}
     assert obj.dict(exclude_unset=True) == expected
+
+
+def test_schemas_are_memoized():
+    assert SchemaFactory.output_schema(User, BaseModelSchema) is SchemaFactory.output_schema(User, BaseModelSchema)
+    assert SchemaFactory.input_schema(User, BaseModelSchema, exclude=['id']) is SchemaFactory.input_schema(
+        User, BaseModelSchema, exclude=('id',),
+    )
+    assert SchemaFactory.input_schema(User, BaseModelSchema, exclude=('id',)) is not SchemaFactory.input_schema(
+        User, BaseModelSchema,
+    )
+    assert SchemaFactory.filter_schema(User) is SchemaFactory.filter_schema(User)
+    output_schema = SchemaFactory.output_schema(User, BaseModelSchema)
+    list_schema = SchemaFactory.list_schema(output_schema, BasePaginatedListSchema, 'UserListSchema')
+    assert SchemaFactory.list_schema(output_schema, BasePaginatedListSchema, 'UserListSchema') is list_schema
+
+
+def test_expanded_schema_has_own_name():
+    output_schema = SchemaFactory.output_schema(User, BaseModelSchema)
+    team_schema = SchemaFactory.output_schema(Team, BaseModelSchema, postfix='Related')
+    expanded_schema = SchemaFactory.expanded_schema(User, output_schema, {'team': team_schema})
+    assert expanded_schema.__name__ == 'UserExpandedTeamOutputSchema'
+    assert expanded_schema is SchemaFactory.expanded_schema(User, output_schema, {'team': team_schema})
+    assert output_schema.__name__ == 'UserOutputSchema'
+
+
+def test_partial_schema_keeps_validators():
+    class UserUpperOutputSchema(SchemaFactory.output_schema(User, BaseModelSchema)):
+
+        @validator('nickname')
+        def upper_nickname(cls, value):
+            return value.upper()
+
+    partial_schema = SchemaFactory.partial_schema(UserUpperOutputSchema, {'id', 'nickname', 'unknown'})
+    assert list(partial_schema.__fields__) == ['id', 'nickname']
+    assert partial_schema is SchemaFactory.partial_schema(UserUpperOutputSchema, {'nickname', 'id'})
+    assert list(UserUpperOutputSchema.__fields__) != list(partial_schema.__fields__)
+    user = User(id=1, nickname='Alex', required='req')
+    assert partial_schema.from_orm(user).dict(by_alias=True) == {'id': 1, 'nickname': 'ALEX'}
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+from ginodantic import BaseModelSchema
+from pydantic import BaseModel, Field
+
+from fastapi_gino_viewsets.schema_factory import SchemaFactory
+from fastapi_gino_viewsets.serialization import dumps, make_serializer, serialize
+from tests.models import User, UserType
+
+user = User(
+    id=1,
+    required='req',
+    nickname='Alex',
+    type=UserType.ADMIN,
+    age=30,
+    birthday=datetime(2020, 1, 2, 3, 4, 5),
+    email_list=['user@gmail.com'],
+)
+UserOutputSchema = SchemaFactory.output_schema(User, base_schema=BaseModelSchema)
+serializer = make_serializer(UserOutputSchema)
+
+
+class UserAliasSchema(BaseModel):
+    id: int
+    nickname: str = Field(..., alias='name')
+
+    class Config:
+        orm_mode = True
+        allow_population_by_field_name = True
+
+
+@pytest.mark.parametrize('data', [
+    user,
+    {'data': user},
+    [user, user],
+    {'data': [user], 'pagination': {'offset': 0, 'limit': 0, 'total': 1}},
+])
+def test_serialize_matches_schema(data):
+    def expected(value):
+        if isinstance(value, dict):
+            return {k: expected(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [expected(v) for v in value]
+        if isinstance(value, User):
+            return UserOutputSchema.from_orm(value).dict()
+        return value
+
+    assert serialize(data, User, serializer) == expected(data)
+
+
+def test_serializer_reads_fields_by_name():
+    alias_serializer = make_serializer(UserAliasSchema)
+    assert alias_serializer(user) == {'id': 1, 'name': 'Alex'}
+    assert alias_serializer(user) == UserAliasSchema.from_orm(user).dict(by_alias=True)
+    assert alias_serializer.only({'name'})(user) == {'name': 'Alex'}
+
+
+def test_dumps():
+    data = serialize({'data': user}, User, serializer)
+    assert dumps(data) == UserOutputSchema.from_orm(user).json(separators=(',', ':')).join(
+        ('{"data":', '}'),
+    ).encode()
@@ -0,0 +1,56 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import bindparam
+from sqlalchemy.dialects import postgresql
+
+from fastapi_gino_viewsets import MainRouter
+from fastapi_gino_viewsets.mixins import SlowQueryLogMixin
+from fastapi_gino_viewsets.query_cache import CompiledQuery
+from fastapi_gino_viewsets.slow_queries import QueryContext, SlowQueryLog
+from fastapi_gino_viewsets.viewsets import ViewSet
+from tests.models import User
+
+app = FastAPI()
+router = MainRouter()
+client = TestClient(app)
+slow_query_log = SlowQueryLog(threshold=0, maxsize=3, explain_rate=1)
+
+
+@router.add_view('/slow')
+class UserSlowQueryViewSet(SlowQueryLogMixin, ViewSet):
+    model = User
+    filter_schema = None
+    slow_query_log = slow_query_log
+
+
+router.add_slow_query_route('/slow_queries', log=slow_query_log)
+app.include_router(router)
+
+
+@pytest.mark.asyncio
+async def test_record_compiled_query():
+    log = SlowQueryLog(maxsize=2)
+    context = QueryContext(log, 'View', 'retrieve', 'GET /users/1')
+    compiled = User.query.where(User.id == bindparam('key')).compile(dialect=postgresql.dialect(paramstyle='numeric'))
+    query = CompiledQuery(None, compiled, {'key': 1})
+    for _ in range(3):
+        record = await log.add(context, 'get_object_or_404', query, 0.75)
+    assert len(log.records) == 2
+    assert record['params'] == [1]
+    assert 'WHERE users.id = :1' in record['sql']
+    assert record['view'] == 'View' and record['route'] == 'GET /users/1'
+    assert record['explain'] is None
+
+
+def test_slow_query_endpoint(engine, create_users):
+    slow_query_log.clear()
+    with client:
+        assert client.get('/slow?limit=2&sort=-age&age__ge=20').status_code == 200
+        records = client.get('/slow_queries').json()
+    assert [record['kind'] for record in records] == ['prepare_data_hook', 'total']
+    assert all(record['explain'][0]['Plan'] for record in records)
+    assert records[0]['route'] == 'GET /slow'
+    assert records[0]['sort'] == ['-age']
+    assert records[0]['filters'] == {'age__ge': 20}
+    assert records[0]['params'][-1] == 0
@@ -1,6 +1,11 @@
+from datetime import datetime
+from decimal import Decimal
+
 import pytest
+from fastapi import HTTPException
 
-from fastapi_gino_viewsets.utils import camel_to_snake_case
+from fastapi_gino_viewsets.utils import camel_to_snake_case, decode_cursor, encode_cursor
+from tests.models import UserType
 
 
 @pytest.mark.parametrize('input, output', (
@@ -10,3 +15,20 @@ from fastapi_gino_viewsets.utils import camel_to_snake_case
 ))
 def test_camel_to_snake_case(input, output):
     assert camel_to_snake_case(input) == output
+
+
+@pytest.mark.parametrize('values, expected', (
+        ([1], [1]),
+        (['Alex', 2], ['Alex', 2]),
+        ([datetime(2020, 1, 2, 3, 4, 5), Decimal('1.5'), None], [datetime(2020, 1, 2, 3, 4, 5), Decimal('1.5'), None]),
+        ([UserType.ADMIN, 3], ['ADMIN', 3]),
+))
+def test_cursor_roundtrip(values, expected):
+    assert decode_cursor(encode_cursor(values)) == expected
+
+
+@pytest.mark.parametrize('cursor', ('!!!', 'e30', 'W3sidCI6ICJ4In1d'))
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor)
+    assert e.value.status_code == 400